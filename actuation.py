@@ -0,0 +1,93 @@
+import time
+
+# a vehicle.control bemenetek érvényes tartománya
+RANGES = {
+    "steering": (-1.0, 1.0),
+    "throttle": (0.0, 1.0),
+    "brake": (0.0, 1.0),
+    "parkingbrake": (0.0, 1.0),
+    "clutch": (0.0, 1.0),
+}
+# ennél kisebb változásért nem küldünk új parancsot
+DEFAULT_DEADBAND = {"steering": 0.01, "throttle": 0.02, "brake": 0.02}
+
+
+# A vehicle.control elé tett réteg: ugyanaz a felület (control, sensors, a többi a valódi
+# járműé), de minden parancs egy szimulátor-körút, ezért:
+# - a bemeneteket a RANGES tartományba vágja (a control_loop steering-je ±3 is lehet),
+# - slew_rate: bemenetenként a megengedett változás másodpercenként, a cél felé ennyivel lép,
+#   a maradékot a következő control / flush hívás küldi,
+# - deadband: az utoljára elküldött értéktől ennél kisebb eltérést nem küld el (a tartomány
+#   széleit és a 0-t mindig, hogy a teljes fék / gáz elengedése ne ragadjon be),
+# - csak a ténylegesen változott bemeneteket küldi, és ha semmi sem változott, nem küld semmit.
+# clock: az idő a slew-hoz (fifth_test-ben a szimulátor ideje, hogy a léptetett módban is jó legyen).
+class Actuator:
+    def __init__(self, vehicle, deadband=None, slew_rate=None, clock=time.monotonic):
+        self.vehicle = vehicle
+        self.sensors = vehicle.sensors
+        self.deadband = DEFAULT_DEADBAND if deadband is None else deadband
+        self.slew_rate = slew_rate or {}
+        self.clock = clock
+        self.target = {}  # a legutóbb kért (már levágott) értékek
+        self.output = {}  # a járműnek utoljára elküldött értékek
+        self.sent_at = {}  # bemenetenként az utolsó küldés ideje (a slew-hoz)
+        self.calls = 0
+        self.sent = 0
+        self.saved = 0
+        self.clamped = 0
+
+    # minden más (set_shift_mode, set_part_config, ...) a valódi járműé
+    def __getattr__(self, name):
+        return getattr(self.vehicle, name)
+
+    def control(self, **command):
+        self.calls += 1
+        for name, value in command.items():
+            if value is None:
+                continue
+            if name in RANGES:
+                low, high = RANGES[name]
+                if not low <= value <= high:
+                    self.clamped += 1
+                    value = min(high, max(low, value))
+            self.target[name] = value
+        if not self.apply():
+            self.saved += 1
+
+    # a slew miatt még el nem ért célok felé lép; tickenként egyszer érdemes hívni
+    def flush(self):
+        if self.target != self.output:
+            self.apply()
+
+    # a cél felé a slew és a deadband szerint; True, ha küldött parancsot
+    def apply(self):
+        now = self.clock()
+        delta = {}
+        for name, target in self.target.items():
+            last = self.output.get(name)
+            if last is None or name not in RANGES:
+                if last != target:
+                    delta[name] = target
+                continue
+            value = target
+            rate = self.slew_rate.get(name)
+            if rate is not None:
+                step = rate * max(0.0, now - self.sent_at.get(name, now))
+                value = min(last + step, max(last - step, value))
+            if value == last:
+                continue
+            if abs(value - last) < self.deadband.get(name, 0.0) and value not in (0.0, *RANGES[name]):
+                continue
+            delta[name] = value
+        if not delta:
+            return False
+        self.vehicle.control(**delta)
+        self.output.update(delta)
+        for name in delta:
+            self.sent_at[name] = now
+        self.sent += 1
+        return True
+
+    def report(self):
+        print(f"  actuation: {self.calls} control calls, {self.sent} sent, {self.saved} round-trips saved, "
+              f"{self.clamped} values clamped")
@@ -0,0 +1,148 @@
+import sys
+
+import numpy as np
+
+
+# Vezérlők offline kiértékelése felvett yaw_rate / angAccel sorokon, numpy műveletekkel.
+# A paraméterek lehetnek skalárok vagy P hosszú tömbök: ilyenkor minden kimenet
+# (P, T) alakú, vagyis egyszerre P paraméterkészletet értékelünk ki a teljes felvételen.
+# Ez nyílt hurkú kiértékelés: a felvett jelre számolja ki, mit parancsolna a vezérlő.
+
+
+def as_column(value):
+    return np.asarray(value, dtype=float).reshape(-1, 1)
+
+
+# Az imu_replay / telemetry_recorder felvételeiből (idő, yaw_rate, angAccel) tömbök
+def traces_from_imu_dump(path):
+    from imu_replay import load_imu_dump
+
+    samples = load_imu_dump(path)
+    time = np.array([s["time"] for s in samples])
+    yaw_rate = np.array([s["angVel"][2] for s in samples])
+    velocity = np.array([s["angAccel"][2] for s in samples])
+    return time, yaw_rate, velocity
+
+
+def traces_from_telemetry(path):
+    from telemetry_recorder import load_telemetry
+
+    columns = load_telemetry(path)
+    return columns["time"], columns["yaw_rate"], columns["velocity"]
+
+
+# Csúszóablakos min/max, mint a RollingNormalizer: az első window-1 mintánál
+# a részleges ablakot az első értékkel kitöltve kapjuk meg.
+def rolling_min_max(values, window=20):
+    values = np.asarray(values, dtype=float)
+    padded = np.concatenate([np.full(window - 1, values[0]), values])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+    return windows.min(axis=1), windows.max(axis=1)
+
+
+def rolling_normalize(values, window=20):
+    values = np.asarray(values, dtype=float)
+    low, high = rolling_min_max(values, window)
+    value_range = high - low
+    safe_range = np.where(value_range == 0, 1.0, value_range)
+    return np.where(value_range == 0, 0.0, -1 + 2 * ((values - low) / safe_range))
+
+
+# fifth_test.py control_loop kormányzása: steering = aggression * norm_yaw + norm_vel,
+# az első tickben 0
+def normalization_steering(yaw_rate, velocity, aggression=2, window=20):
+    normalized_yaw_rate = rolling_normalize(yaw_rate, window)
+    normalized_velocity = rolling_normalize(velocity, window)
+    steering = as_column(aggression) * normalized_yaw_rate + normalized_velocity
+    steering[:, 0] = 0
+    return steering
+
+
+# Gázszabályozás: ha |error| > error_threshold, akkor max(floor, 1 - |error| * gain), különben 1.
+# fifth_test.py: floor=0.3, gain=2; third_test.py: floor=0.5, gain=5
+def throttle_law(error, error_threshold=0.1, floor=0.3, gain=2):
+    abs_error = np.abs(error)
+    reduced = np.maximum(as_column(floor), 1 - abs_error * as_column(gain))
+    return np.where(abs_error > as_column(error_threshold), reduced, 1.0)
+
+
+def normalization_error(yaw_rate, desired_yaw_rate=2):
+    return as_column(desired_yaw_rate) - np.abs(np.asarray(yaw_rate, dtype=float))
+
+
+# third_test.py PID-je: az integrál kumulált összeg, a derivált visszafelé különbség
+# (prev_error kezdetben 0), dt a felvett időbélyegekből
+def pid_steering(yaw_rate, time, Kp=0.5, Ki=0.1, Kd=0.05, desired_yaw_rate=-2):
+    yaw_rate = np.asarray(yaw_rate, dtype=float)
+    dt = np.diff(np.asarray(time, dtype=float), prepend=time[0] - 0.01)
+    dt = np.where(dt > 0, dt, 0.01)
+    error = as_column(desired_yaw_rate) - yaw_rate
+    error_integral = np.cumsum(error * dt, axis=1)
+    error_derivative = np.diff(error, axis=1, prepend=0) / dt
+    steering = as_column(Kp) * error + as_column(Ki) * error_integral + as_column(Kd) * error_derivative
+    return steering, error
+
+
+# Hibametrikák paraméterkészletenként (a (P, T) tömbök utolsó tengelyén)
+def metrics(error, steering, throttle):
+    return {
+        "rmse": np.sqrt(np.mean(error ** 2, axis=-1)),
+        "mean_abs_error": np.mean(np.abs(error), axis=-1),
+        "saturation": np.mean(np.abs(steering) > 1, axis=-1),  # |steering| > 1 arány
+        "steering_rate": np.mean(np.abs(np.diff(steering, axis=-1)), axis=-1),
+        "mean_throttle": np.mean(throttle, axis=-1),
+    }
+
+
+def evaluate_normalization(yaw_rate, velocity, aggression=2, desired_yaw_rate=2,
+                           error_threshold=0.1, floor=0.3, gain=2, window=20):
+    steering = normalization_steering(yaw_rate, velocity, aggression, window)
+    error = normalization_error(yaw_rate, desired_yaw_rate)
+    throttle = throttle_law(error, error_threshold, floor, gain)
+    steering, error, throttle = np.broadcast_arrays(steering, error, throttle)
+    return {"steering": steering, "throttle": throttle, "error": error,
+            **metrics(error, steering, throttle)}
+
+
+def evaluate_pid(yaw_rate, time, Kp=0.5, Ki=0.1, Kd=0.05, desired_yaw_rate=-2,
+                 error_threshold=0.1, floor=0.5, gain=5):
+    steering, error = pid_steering(yaw_rate, time, Kp, Ki, Kd, desired_yaw_rate)
+    throttle = throttle_law(error, error_threshold, floor, gain)
+    steering, error, throttle = np.broadcast_arrays(steering, error, throttle)
+    return {"steering": steering, "throttle": throttle, "error": error,
+            **metrics(error, steering, throttle)}
+
+
+# Paraméterrács: gain_grid(Kp=[...], Ki=[...]) -> {"Kp": P hosszú tömb, "Ki": ...}
+def gain_grid(**ranges):
+    names = list(ranges)
+    mesh = np.meshgrid(*(np.asarray(ranges[name], dtype=float) for name in names), indexing="ij")
+    return {name: axis.ravel() for name, axis in zip(names, mesh)}
+
+
+# Felvételenként: a scriptekben használt alapértékek metrikái, és egy teljes rács
+# kiértékelésének ideje. Az (open loop) rácsot gain_grid + evaluate_* adja.
+def main():
+    import time as timer
+
+    paths = sys.argv[1:] or ["tmp_left_circle.json", "tmp_right_circle.json"]
+    for path in paths:
+        time, yaw_rate, velocity = traces_from_imu_dump(path)
+        print(f"=== {path} ({len(yaw_rate)} samples) ===")
+
+        start = timer.perf_counter()
+        grid = gain_grid(Kp=np.linspace(0, 2, 21), Ki=np.linspace(0, 0.5, 11), Kd=np.linspace(0, 0.2, 11))
+        pid = evaluate_pid(yaw_rate, time, **grid)
+        aggression = np.linspace(0, 4, 41)
+        normalization = evaluate_normalization(yaw_rate, velocity, aggression=aggression)
+        elapsed = timer.perf_counter() - start
+        print(f"{len(pid['rmse'])} PID gain sets + {len(aggression)} aggression values in {elapsed * 1000:.1f} ms")
+
+        pid = evaluate_pid(yaw_rate, time, Kp=0.5, Ki=0.1, Kd=0.05, desired_yaw_rate=-2)
+        normalization = evaluate_normalization(yaw_rate, velocity, aggression=2)
+        for name, result in (("third_test PID", pid), ("fifth_test normalization", normalization)):
+            print(f"{name}: rmse {result['rmse'][0]:.3f}, saturation {result['saturation'][0]:.2f}, "
+                  f"steering_rate {result['steering_rate'][0]:.3f}, mean_throttle {result['mean_throttle'][0]:.2f}")
+
+if __name__ == "__main__":
+    main()
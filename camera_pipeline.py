@@ -0,0 +1,364 @@
+import math
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+HEADER_BYTES = 256  # számlálók és az eredmény, a képek előtt, cache line határon
+# az int64 fejléc: [0] az írt képek száma, [1] az eredmény sorszáma (páratlan: írás alatt)
+COUNTER, RESULT_SEQ = 0, 1
+RESULT_OFFSET = 64
+# a worker eredménye (float64), ebben a sorrendben
+RESULT_FIELDS = ("frame", "capture_time", "curvature", "offset", "confidence", "processed_time")
+SLOT_OFFSET = 128  # képkockánként: sorszám (int64) és rögzítési idő (float64)
+MAX_SLOTS = 8
+
+
+# Előre lefoglalt képkocka-gyűrű osztott memóriában a vezérlő és a kamera-worker között.
+# A vezérlő (egyetlen író) a kamera colour pufferét a következő slotba másolja (np.copyto,
+# nincs képenkénti foglalás), a worker mindig csak a legfrissebb képet dolgozza fel,
+# a közben érkezetteket kihagyja. Slotonként seqlock: írás alatt páratlan sorszám, így a
+# worker észreveszi, ha olvasás közben felülírták a slotot, és azt a képet eldobja.
+# Visszafelé csak a kicsi eredmény jön (görbület, oldalirányú eltérés), ugyanígy seqlockkal.
+class FrameRing:
+    def __init__(self, shm, width, height, slots, owner):
+        self.shm = shm
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.owner = owner
+        self.header = np.ndarray((RESULT_OFFSET // 8,), dtype=np.int64, buffer=shm.buf)
+        self.result = np.ndarray((len(RESULT_FIELDS),), dtype=np.float64, buffer=shm.buf, offset=RESULT_OFFSET)
+        self.slot_seq = np.ndarray((MAX_SLOTS,), dtype=np.int64, buffer=shm.buf, offset=SLOT_OFFSET)
+        self.slot_time = np.ndarray((MAX_SLOTS,), dtype=np.float64, buffer=shm.buf,
+                                    offset=SLOT_OFFSET + 8 * MAX_SLOTS)
+        self.frames = np.ndarray((slots, height, width, 4), dtype=np.uint8, buffer=shm.buf, offset=HEADER_BYTES)
+        self.values = np.empty(len(RESULT_FIELDS))
+        self.published = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @staticmethod
+    def size(width, height, slots):
+        return HEADER_BYTES + slots * height * width * 4
+
+    # width, height: a kamera felbontása (a Camera resolution paramétere)
+    @classmethod
+    def create(cls, width, height, slots=3):
+        if not 2 <= slots <= MAX_SLOTS:
+            raise ValueError(f"slots must be between 2 and {MAX_SLOTS}")
+        shm = shared_memory.SharedMemory(create=True, size=cls.size(width, height, slots))
+        ring = cls(shm, width, height, slots, owner=True)
+        ring.header[:] = 0
+        ring.result[:] = math.nan
+        ring.slot_seq[:] = 0
+        return ring
+
+    # ugyanúgy nem regisztráljuk a resource_trackerben, mint a live_dashboard.TelemetryRing-nél
+    @classmethod
+    def attach(cls, name, width, height, slots=3):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, width, height, slots, owner=False)
+
+    # A vezérlő oldala: egy kamera colour puffer (RGBA bájtok, pl. Camera.poll_raw()["colour"])
+    # bemásolása a következő slotba. Hibás méretű (vagy hiányzó) képet nem írunk be.
+    def publish(self, colour, capture_time):
+        if colour is None or len(colour) != self.width * self.height * 4:
+            return False
+        count = int(self.header[COUNTER])
+        slot = count % self.slots
+        self.slot_seq[slot] = 2 * count + 1
+        np.copyto(self.frames[slot], np.frombuffer(colour, dtype=np.uint8).reshape(self.height, self.width, 4))
+        self.slot_time[slot] = capture_time
+        self.slot_seq[slot] = 2 * count + 2
+        self.header[COUNTER] = count + 1
+        return True
+
+    # A worker oldala: a frame sorszámú kép step-pel ritkított RGB része az out tömbbe
+    # ((height // step, width // step, 3) méretű). False, ha közben felülírták.
+    def read_downsampled(self, frame, out, step):
+        slot = frame % self.slots
+        seq = 2 * frame + 2
+        if self.slot_seq[slot] != seq:
+            return False
+        rows, columns = out.shape[:2]
+        np.copyto(out, self.frames[slot, :rows * step:step, :columns * step:step, :3])
+        return self.slot_seq[slot] == seq
+
+    def write_result(self, frame, capture_time, curvature, offset, confidence):
+        seq = int(self.header[RESULT_SEQ])
+        self.header[RESULT_SEQ] = seq + 1
+        self.result[:] = (frame, capture_time, curvature, offset, confidence, time.monotonic())
+        self.header[RESULT_SEQ] = seq + 2
+
+    # A vezérlő oldala: a legutóbbi eredmény dict-ként (a data_dict-be), vagy None, ha még
+    # nincs. Az age a kép rögzítése óta eltelt idő, a latency a rögzítéstől a kész eredményig.
+    def read_result(self):
+        for _ in range(3):
+            seq = int(self.header[RESULT_SEQ])
+            if seq % 2 == 0:
+                np.copyto(self.values, self.result)
+                if int(self.header[RESULT_SEQ]) == seq:
+                    break
+        else:
+            return None
+        frame, capture_time, curvature, offset, confidence, processed_time = self.values.tolist()
+        if math.isnan(frame):
+            return None
+        return {
+            "camera_curvature": curvature,
+            "camera_offset": offset,
+            "camera_confidence": confidence,
+            "camera_age": time.monotonic() - capture_time,
+            "camera_latency": processed_time - capture_time,
+            "camera_skipped": int(self.header[COUNTER]) - 1 - int(frame),
+        }
+
+    def close(self):
+        del self.header, self.result, self.slot_seq, self.slot_time, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Pálya- / sávhatár-felismerés egy ritkított RGB képen, az autó elé néző kamerából.
+# 1. az út színe: a kép alsó közepének mediánja (az autó előtt közvetlenül út van),
+# 2. a horizont alatti sorokban az ehhez hasonló színű pixelek az út,
+# 3. soronként a középoszloptól balra és jobbra az első nem-út pixel a pályahatár,
+# 4. a két határ közepére sorokon át másodfokú görbe: a görbület (a kép síkjában, képszélességben
+#    mérve, pozitív: jobbra kanyarodik) és az alsó sorban az autó eltérése a pálya közepétől
+#    (fél pályaszélességben, pozitív: az autó a középtől jobbra van).
+# A confidence azoknak a soroknak az aránya, ahol mindkét határ megvan.
+# A munkatömbök előre le vannak foglalva, képenként csak soronkénti kis tömbök keletkeznek.
+class TrackBoundaryDetector:
+    def __init__(self, height, width, horizon=0.45, tolerance=40.0, sample=0.1, min_rows=5):
+        self.height = height
+        self.width = width
+        self.top = int(height * horizon)  # e fölött ég / távoli táj, nem nézzük
+        self.tolerance = tolerance  # ennyi színtávolságon (0-255 skálán) belül még út
+        self.min_rows = min_rows
+        rows = height - self.top
+        patch = max(1, int(width * sample))
+        self.sample_rows = slice(height - max(1, int(height * sample)), height)
+        self.sample_columns = slice(width // 2 - patch // 2, width // 2 + patch // 2 + 1)
+        self.distance = np.empty((rows, width), dtype=np.float32)
+        self.channel = np.empty((rows, width), dtype=np.float32)
+        self.road = np.empty((rows, width), dtype=bool)
+        self.center = width // 2
+        # a sorok magassága a kép aljától, képszélességben (a görbe változója)
+        self.y = (height - 1 - np.arange(self.top, height)) / width
+        self.vandermonde = np.stack([self.y ** 2, self.y, np.ones_like(self.y)], axis=1)
+        # soronkénti v v' szorzatok: a normálegyenlet mátrixa ezek érvényes sorokra vett összege
+        self.moments = (self.vandermonde[:, :, None] * self.vandermonde[:, None, :]).reshape(rows, 9)
+        # képkockánként újrahasznált pufferek, hogy az update ne foglaljon memóriát
+        self.patch = np.empty((self.sample_rows.stop - self.sample_rows.start,
+                               self.sample_columns.stop - self.sample_columns.start, 3), dtype=np.uint8)
+        self.reference = np.empty(3, dtype=np.float32)
+        self.left = np.zeros(rows, dtype=np.int64)
+        self.right = np.zeros(rows, dtype=np.int64)
+        self.weight = np.zeros(rows)  # 1 az érvényes sorokra
+        self.middle = np.zeros(rows)
+        self.widths = np.zeros(min_rows, dtype=np.int64)
+        self.normal = np.zeros(9)
+        self.rhs = np.zeros(3)
+        self.curvature = 0.0
+        self.offset = 0.0
+        self.confidence = 0.0
+
+    def update(self, rgb):
+        # medián helyben: a minta a pufferbe másolva, csak a középső elem(ek)ig részben rendezve
+        patch = self.patch.reshape(-1, 3)
+        np.copyto(self.patch, rgb[self.sample_rows, self.sample_columns])
+        low, high = (len(patch) - 1) // 2, len(patch) // 2
+        patch.partition((low, high), axis=0)
+        reference = np.add(patch[low], patch[high], out=self.reference, dtype=np.float32)
+        reference *= 0.5
+        region = rgb[self.top:]
+        # a referenciaszíntől mért legnagyobb csatornánkénti eltérés
+        distance, channel = self.distance, self.channel
+        distance.fill(0)
+        for c in range(3):
+            np.subtract(region[..., c], np.float32(reference[c]), out=channel, dtype=np.float32)
+            np.abs(channel, out=channel)
+            np.maximum(distance, channel, out=distance)
+        road = np.less(distance, self.tolerance, out=self.road)
+
+        # A keresést soronként az előző (alsóbb) sor útközepéből indítjuk, így a képközéptől
+        # elcsúszott vagy elkanyarodó út felső sorai is megmaradnak. Ha a kezdőpont nem út,
+        # a sor hozzá legközelebbi út-pixeléből indulunk; ahol a sorban nincs út, kihagyjuk.
+        rows = road.shape[0]
+        left, right, weight = self.left, self.right, self.weight
+        left.fill(0)
+        right.fill(0)
+        weight.fill(0)
+        found = 0
+        seed = self.center
+        for row in range(rows - 1, -1, -1):
+            line = road[row]
+            if not line[seed]:
+                # a legközelebbi út-pixel jobbra és balra (argmax az első True-t adja)
+                ahead = int(np.argmax(line[seed:]))
+                behind = int(np.argmax(line[seed::-1]))
+                ahead = ahead if line[seed + ahead] else None
+                behind = behind if line[seed - behind] else None
+                if ahead is None and behind is None:
+                    continue
+                if ahead is None or (behind is not None and behind <= ahead):
+                    seed -= behind
+                else:
+                    seed += ahead
+            # balra: a kezdőponttól visszafelé az első nem-út pixel, jobbra: előre
+            left_part = line[seed::-1]
+            right_part = line[seed:]
+            # a kép széléig tartó út: nincs határ, a sort kihagyjuk
+            if left_part.all() or right_part.all():
+                continue
+            left[row] = seed - np.argmin(left_part)
+            right[row] = seed + np.argmin(right_part)
+            weight[row] = 1.0
+            if found < self.min_rows:
+                self.widths[found] = right[row] - left[row]  # a legalsó érvényes sorok útszélessége
+            found += 1
+            seed = int(left[row] + right[row]) // 2
+
+        self.confidence = found / rows
+        if found < self.min_rows:
+            self.curvature = self.offset = 0.0
+            self.confidence = 0.0
+            return
+        # legkisebb négyzetek a fix 3x3-as normálegyenlettel (lstsq helyett)
+        middle = np.add(left, right, out=self.middle)
+        middle *= 0.5 / self.width
+        middle *= weight
+        np.dot(weight, self.moments, out=self.normal)
+        np.dot(middle, self.vandermonde, out=self.rhs)
+        a, b, c = np.linalg.solve(self.normal.reshape(3, 3), self.rhs)
+        self.curvature = float(2 * a)
+        widths = self.widths
+        low, high = (len(widths) - 1) // 2, len(widths) // 2
+        widths.partition((low, high))
+        bottom_half_width = (widths[low] + widths[high]) / 4 / self.width
+        self.offset = float((self.center / self.width - c) / max(bottom_half_width, 1e-6))
+
+
+# A worker process: a legfrissebb képet dolgozza fel, a közbensőket kihagyja, amíg a stop
+# Event be nem áll. step: ennyiszeres ritkítás mindkét irányban a felismerés előtt.
+def run_camera_worker(name, width, height, slots, stop, step=4, poll_interval=0.005):
+    ring = FrameRing.attach(name, width, height, slots)
+    small = np.empty((height // step, width // step, 3), dtype=np.uint8)
+    detector = TrackBoundaryDetector(*small.shape[:2])
+    processed = 0
+    try:
+        while not stop.is_set():
+            count = int(ring.header[COUNTER])
+            if count <= processed:
+                stop.wait(poll_interval)
+                continue
+            frame = count - 1
+            processed = count
+            if not ring.read_downsampled(frame, small, step):
+                continue
+            capture_time = float(ring.slot_time[frame % slots])
+            detector.update(small)
+            ring.write_result(frame, capture_time, detector.curvature, detector.offset, detector.confidence)
+    finally:
+        ring.close()
+
+
+# Külön processz, mint a dashboard: a vezérlő szálán semmilyen képfeldolgozás nem fut
+class CameraPipeline:
+    def __init__(self, width, height, slots=3, step=4):
+        import multiprocessing
+
+        self.ring = FrameRing.create(width, height, slots)
+        self.stop_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=run_camera_worker, args=(self.ring.name, width, height, slots, self.stop_event),
+            kwargs={"step": step}, daemon=True)
+        self.frames = 0
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def publish(self, colour, capture_time=None):
+        if self.ring.publish(colour, time.monotonic() if capture_time is None else capture_time):
+            self.frames += 1
+
+    def result(self):
+        return self.ring.read_result()
+
+    def stop(self):
+        self.stop_event.set()
+        self.process.join(timeout=2)
+        self.ring.close()
+
+
+# Szintetikus kép: szürke, height-ben felfelé szűkülő és jobbra kanyarodó út zöld háttéren
+def synthetic_frame(width, height, shift=0.0, bend=0.3, seed=1703):
+    rng = np.random.default_rng(seed)
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[...] = (60, 120, 50, 255)
+    frame[: height // 3] = (150, 190, 230, 255)
+    rows = np.arange(height // 3, height)
+    y = (height - 1 - rows) / width
+    middle = (0.5 - shift * 0.2 + bend * y ** 2) * width
+    half = (0.05 + 0.3 * (rows - height // 3) / (height - height // 3)) * width
+    columns = np.arange(width)
+    road = np.abs(columns[None, :] - middle[:, None]) < half[:, None]
+    frame[height // 3:][road] = (90, 90, 95, 255)
+    frame[..., :3] = np.clip(frame[..., :3] + rng.integers(-8, 9, frame[..., :3].shape), 0, 255)
+    return frame
+
+
+# Mérés: a vezérlő oldali publish / read_result ideje és a worker késleltetése szintetikus képekkel
+def main():
+    width, height = (int(value) for value in sys.argv[1:3]) if len(sys.argv) > 2 else (640, 480)
+    frames = [synthetic_frame(width, height, shift=shift).tobytes() for shift in (-0.5, 0.0, 0.5)]
+    pipeline = CameraPipeline(width, height).start()
+    publish_times = []
+    results = []
+    try:
+        for i in range(150):
+            start = time.perf_counter()
+            pipeline.publish(frames[i % 3])
+            result = pipeline.result()
+            publish_times.append(time.perf_counter() - start)
+            if result is not None:
+                results.append(result)
+            time.sleep(0.02)
+    finally:
+        pipeline.stop()
+    publish_times.sort()
+    latencies = sorted(result["camera_latency"] for result in results)
+    print(f"{width}x{height}: publish + read p50 {publish_times[len(publish_times) // 2] * 1e6:.0f} us, "
+          f"max {publish_times[-1] * 1e6:.0f} us")
+    if latencies:
+        print(f"worker latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+        print(", ".join(f"{name} {value:.3f}" for name, value in results[-1].items()))
+
+    # ugyanaz a kanyar (bend = 0.3, görbület 0.6) oldalra tolva: a görbület nem függhet az eltolástól
+    detector = TrackBoundaryDetector(height // 4, width // 4)
+    curvatures = []
+    for shift in (-0.5, 0.0, 0.5):
+        frame = synthetic_frame(width, height, shift=shift)
+        detector.update(np.ascontiguousarray(frame[::4, ::4, :3]))
+        curvatures.append(detector.curvature)
+        print(f"shift {shift:+.1f}: offset {detector.offset:+.3f}, curvature {detector.curvature:+.3f}, "
+              f"confidence {detector.confidence:.2f}")
+    spread = max(curvatures) - min(curvatures)
+    print(f"curvature spread across shifts {spread:.3f}: {'ok' if spread < 0.2 else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
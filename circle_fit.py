@@ -0,0 +1,226 @@
+import math
+from collections import deque
+
+
+# 3x3-as lineáris egyenletrendszer Cramer-szabállyal; szinguláris (egyenes pálya) esetén None.
+# A determinánst a főátló szorzatához mérjük, így a küszöb nem függ a pozíciók nagyságrendjétől.
+def solve3(a, b, eps=1e-12):
+    (a11, a12, a13), (a21, a22, a23), (a31, a32, a33) = a
+    c1 = a22 * a33 - a23 * a32
+    c2 = a21 * a33 - a23 * a31
+    c3 = a21 * a32 - a22 * a31
+    det = a11 * c1 - a12 * c2 + a13 * c3
+    if abs(det) <= eps * abs(a11 * a22 * a33):
+        return None
+    b1, b2, b3 = b
+    x1 = (b1 * c1 - a12 * (b2 * a33 - a23 * b3) + a13 * (b2 * a32 - a22 * b3)) / det
+    x2 = (a11 * (b2 * a33 - a23 * b3) - b1 * c2 + a13 * (a21 * b3 - b2 * a31)) / det
+    x3 = (a11 * (a22 * b3 - b2 * a32) - a12 * (a21 * b3 - b2 * a31) + b1 * c3) / det
+    return x1, x2, x3
+
+
+# Folyamatos algebrai (Kåsa) körillesztés az IMU pos (x, y) mintáira, csúszóablakon.
+# Az x² + y² + D·x + E·y + F = 0 kör legkisebb négyzetes illesztéséhez csak az ablak
+# momentumösszegei kellenek (Σx, Σy, Σx², Σy², Σxy, Σz, Σxz, Σyz, ahol z = x² + y²):
+# ezeket mintánként O(1)-ben frissítjük, mint a DirectionClassifier az összegeit, és egy
+# 3x3-as egyenletből kapjuk a középpontot és a sugarat.
+# Spirál mérése: a sugár változási sebessége (radius_drift, m/s, negatív: befelé húzó spirál)
+# és a középpont elmozdulása másodpercenként (center_drift, m/s), drift_seconds időre visszanézve.
+# A kerekítési hibák miatt resync mintánként az összegeket újraszámoljuk, az origót pedig a
+# legutóbbi mintára tesszük (a BeamNG koordináták nagyok lehetnek).
+# Amíg nincs érvényes kör (valid = False), a középpont, a sugár és a driftek NaN-ok, hogy egy
+# régi illesztés ne kerüljön frissként a felvételbe / dashboardra.
+class CircleFitter:
+    def __init__(self, window=150, min_samples=20, min_radius=1.0, max_radius=200.0, drift_seconds=1.0,
+                 resync=1024):
+        self.window = window  # minta; 100 Hz-es IMU-val 1.5 s
+        self.min_samples = min_samples
+        self.min_radius = min_radius  # ez alatt álló autó (a pozíció zaja), nem kör
+        self.max_radius = max_radius  # ennél nagyobb sugárnál egyenesnek vesszük a pályát
+        self.drift_seconds = drift_seconds
+        self.resync = resync
+        self.points = deque()
+        self.history = deque()  # (time, center_x, center_y, radius) az érvényes illesztésekből
+        self.origin = None
+        self.since_resync = 0
+        self.sums = [0.0] * 8
+        self.valid = False
+        self.center_x = self.center_y = self.radius = math.nan
+        self.radius_drift = math.nan
+        self.center_drift = math.nan
+
+    def moments(self, x, y):
+        x -= self.origin[0]
+        y -= self.origin[1]
+        z = x * x + y * y
+        return x, y, x * x, y * y, x * y, z, x * z, y * z
+
+    def add(self, x, y):
+        if self.origin is None:
+            self.origin = (x, y)
+        sums = self.sums
+        for i, value in enumerate(self.moments(x, y)):
+            sums[i] += value
+        self.points.append((x, y))
+        if len(self.points) > self.window:
+            oldest = self.points.popleft()
+            for i, value in enumerate(self.moments(*oldest)):
+                sums[i] -= value
+
+        self.since_resync += 1
+        if self.since_resync >= self.resync:
+            self.recompute()
+
+    def recompute(self):
+        self.origin = self.points[-1]
+        self.sums = [0.0] * 8
+        for point in self.points:
+            for i, value in enumerate(self.moments(*point)):
+                self.sums[i] += value
+        self.since_resync = 0
+
+    # az ablak körének kiszámítása és a drift frissítése a now időpontra
+    def fit(self, now):
+        n = len(self.points)
+        sx, sy, sxx, syy, sxy, sz, sxz, syz = self.sums
+        solution = None
+        if n >= self.min_samples:
+            solution = solve3(((sxx, sxy, sx), (sxy, syy, sy), (sx, sy, n)), (-sxz, -syz, -sz))
+        if solution is not None:
+            d, e, f = solution
+            cx, cy = -d / 2, -e / 2
+            r2 = cx * cx + cy * cy - f
+            solution = (cx, cy, math.sqrt(r2)) if r2 > 0 else None
+        if solution is None or not self.min_radius <= solution[2] <= self.max_radius:
+            self.valid = False
+            self.history.clear()
+            self.center_x = self.center_y = self.radius = math.nan
+            self.radius_drift = self.center_drift = math.nan
+            return False
+
+        cx, cy, radius = solution
+        self.valid = True
+        self.center_x = cx + self.origin[0]
+        self.center_y = cy + self.origin[1]
+        self.radius = radius
+
+        history = self.history
+        history.append((now, self.center_x, self.center_y, radius))
+        # a drift_seconds-nál régebbi illesztések közül csak a legfrissebb kell
+        while len(history) > 2 and now - history[1][0] >= self.drift_seconds:
+            history.popleft()
+        then, old_x, old_y, old_radius = history[0]
+        if now > then:
+            self.radius_drift = (radius - old_radius) / (now - then)
+            self.center_drift = math.hypot(self.center_x - old_x, self.center_y - old_y) / (now - then)
+        else:  # az első érvényes illesztés: még nincs mihez mérni
+            self.radius_drift = self.center_drift = 0.0
+        return True
+
+    def update(self, now, x, y):
+        self.add(x, y)
+        return self.fit(now)
+
+    # egy poll összes mintája (imu_batch.ImuBatch), utána egyetlen illesztés a legfrissebb időre
+    def update_batch(self, batch):
+        if not len(batch):
+            return self.valid
+        for x, y, _ in batch.pos.tolist():
+            self.add(x, y)
+        return self.fit(float(batch.time[-1]))
+
+
+# Ugyanez egész felvételen, vektorizáltan: a csúszóablakos összegek kumulatív összegek
+# különbségei, a 3x3-as egyenleteket pedig egyszerre oldjuk meg. Mintánként a középpont,
+# a sugár és a drift tömböket adja vissza (érvénytelen illesztésnél NaN).
+def fit_circles(time, x, y, window=150, min_samples=20, min_radius=1.0, max_radius=200.0, drift_seconds=1.0):
+    import numpy as np
+
+    time = np.asarray(time, dtype=float)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    origin_x, origin_y = x[0], y[0]  # mint az online változatban, az első mintához képest
+    x = x - origin_x
+    y = y - origin_y
+    z = x * x + y * y
+    moments = np.stack([x, y, x * x, y * y, x * y, z, x * z, y * z])
+    cumulative = np.concatenate([np.zeros((8, 1)), np.cumsum(moments, axis=1)], axis=1)
+    end = np.arange(1, len(x) + 1)
+    start = np.maximum(end - window, 0)
+    sx, sy, sxx, syy, sxy, sz, sxz, syz = cumulative[:, end] - cumulative[:, start]
+    n = (end - start).astype(float)
+
+    a = np.stack([np.stack([sxx, sxy, sx], -1), np.stack([sxy, syy, sy], -1), np.stack([sx, sy, n], -1)], -2)
+    b = np.stack([-sxz, -syz, -sz], -1)
+    valid = (n >= min_samples) & (np.abs(np.linalg.det(a)) > 1e-12 * np.abs(sxx * syy * n))
+    solution = np.full((len(x), 3), np.nan)
+    solution[valid] = np.linalg.solve(a[valid], b[valid][..., None])[..., 0]
+    center_x = -solution[:, 0] / 2
+    center_y = -solution[:, 1] / 2
+    with np.errstate(invalid="ignore"):
+        radius = np.sqrt(center_x ** 2 + center_y ** 2 - solution[:, 2])
+    radius[~((radius >= min_radius) & (radius <= max_radius))] = np.nan
+
+    # drift: az illesztés drift_seconds-szal korábbi értékéhez képest
+    back = np.maximum(np.searchsorted(time, time - drift_seconds, side="right") - 1, 0)
+    dt = time - time[back]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        radius_drift = (radius - radius[back]) / dt
+        center_drift = np.hypot(center_x - center_x[back], center_y - center_y[back]) / dt
+    return {
+        "center_x": center_x + origin_x,
+        "center_y": center_y + origin_y,
+        "radius": radius,
+        "radius_drift": radius_drift,
+        "center_drift": center_drift,
+    }
+
+
+# Offline minőségi mérőszám egy felvételre: mennyire spirál a kör. A driftek abszolút
+# értékének mediánja (m/s), a sugár átlaga és relatív szórása, és hogy a minták mekkora
+# részén volt értelmezhető kör.
+def spiral_metrics(time, x, y, **kwargs):
+    import numpy as np
+
+    fits = fit_circles(time, x, y, **kwargs)
+    radius = fits["radius"]
+    valid = ~np.isnan(radius)
+    drift_valid = ~np.isnan(fits["radius_drift"])
+    metrics = {"samples": len(radius), "valid": float(valid.mean())}
+    if valid.any():
+        metrics["radius"] = float(radius[valid].mean())
+        metrics["radius_cv"] = float(radius[valid].std() / radius[valid].mean())
+    if drift_valid.any():
+        metrics["radius_drift"] = float(np.median(np.abs(fits["radius_drift"][drift_valid])))
+        metrics["center_drift"] = float(np.median(fits["center_drift"][drift_valid]))
+    return metrics
+
+
+# Felvétel betöltése: telemetry_recorder mappa (pos_x / pos_y oszlopokkal) vagy imu_replay dump
+def positions_from_recording(path):
+    import numpy as np
+
+    if path.endswith(".json"):
+        from imu_replay import load_imu_dump
+
+        samples = load_imu_dump(path)
+        return (np.array([s["time"] for s in samples]), np.array([s["pos"][0] for s in samples]),
+                np.array([s["pos"][1] for s in samples]))
+    from telemetry_recorder import load_telemetry
+
+    columns = load_telemetry(path)
+    return columns["time"], columns["pos_x"], columns["pos_y"]
+
+
+def main():
+    import sys
+
+    paths = sys.argv[1:] or ["tmp_left_circle.json", "tmp_right_circle.json"]
+    for path in paths:
+        time, x, y = positions_from_recording(path)
+        metrics = spiral_metrics(time, x, y, window=min(150, len(time)), min_samples=min(20, len(time)))
+        print(f"{path}: " + ", ".join(f"{name} {value:.3f}" if isinstance(value, float) else f"{name} {value}"
+                                       for name, value in metrics.items()))
+
+if __name__ == "__main__":
+    main()
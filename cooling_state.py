@@ -0,0 +1,79 @@
+import random
+
+DRIFTING = "DRIFTING"
+COOLING = "COOLING"
+STOPPING = "STOPPING"
+RELAUNCH = "RELAUNCH"
+
+
+# A régi cooling() függvény nem blokkoló változata. Ha a motor túlmelegszik, abbahagyjuk
+# a driftelést (DRIFTING -> COOLING), lassan előregurulunk amíg visszahűl, megállunk
+# (STOPPING), állva várunk, majd újraindítjuk a körözést (RELAUNCH -> DRIFTING).
+# Minden vezérlési tickben egyszer kell meghívni az update-et a már lekért adatokkal,
+# így nincs külön poll-olás, és közben a telemetria is folyik tovább.
+class CoolingStateMachine:
+    def __init__(self, start_temperature=115, cool_temperature=91, cool_seconds=None,
+                 cooling_throttle=0.2, stop_wait=5, relaunch_steering=None, relaunch_seconds=2):
+        self.start_temperature = start_temperature
+        self.cool_temperature = cool_temperature  # None: csak cool_seconds számít
+        self.cool_seconds = cool_seconds  # None: csak a hőmérséklet számít
+        self.cooling_throttle = cooling_throttle
+        self.stop_wait = stop_wait  # ennyit vár állva újraindítás előtt
+        self.relaunch_steering = relaunch_steering  # None: véletlenül balra vagy jobbra
+        self.relaunch_seconds = relaunch_seconds  # ennyi ideig tartja az indító kormányzást
+        self.state = DRIFTING
+        self.entered = 0.0
+        self.launched = False
+        self.command = {}
+
+    @property
+    def active(self):
+        return self.state != DRIFTING
+
+    def enter(self, state, now):
+        self.state = state
+        self.entered = now
+
+    def send(self, vehicle, **command):
+        self.command = command
+        vehicle.control(**command)
+
+    # now: szimulációs idő másodpercben (pl. az IMU "time" mezője).
+    # True-t ad vissza, ha ebben a tickben a hűtés irányítja az autót.
+    def update(self, vehicle, water_temp, wheelspeed, now):
+        if self.state == DRIFTING:
+            if water_temp <= self.start_temperature:
+                return False
+            self.enter(COOLING, now)
+            self.send(vehicle, steering=0, throttle=self.cooling_throttle, brake=0, parkingbrake=0, clutch=0, gear=3)
+            return True
+
+        if self.state == COOLING:
+            cooled = self.cool_temperature is not None and water_temp <= self.cool_temperature
+            timed_out = self.cool_seconds is not None and now - self.entered >= self.cool_seconds
+            if cooled or timed_out:
+                self.enter(STOPPING, now)
+                self.send(vehicle, steering=0, throttle=0, brake=1)
+            return True
+
+        if self.state == STOPPING:
+            if round(wheelspeed, 1) == 0:
+                self.enter(RELAUNCH, now)
+                self.launched = False
+            return True
+
+        # RELAUNCH: előbb stop_wait ideig áll, utána relaunch_seconds ideig az indító kormányzás
+        if not self.launched:
+            if now - self.entered < self.stop_wait:
+                return True
+            steering = self.relaunch_steering
+            if steering is None:
+                steering = -1 if random.randint(0, 1) == 0 else 1
+            self.send(vehicle, steering=steering, throttle=1, brake=0, parkingbrake=0, clutch=0, gear=3)
+            self.launched = True
+            self.entered = now
+            return True
+        if now - self.entered >= self.relaunch_seconds:
+            self.state = DRIFTING
+            return False
+        return True
@@ -0,0 +1,91 @@
+import math
+
+
+# A second_test.py előre/hátra/álló irányfelismerője folyamatos (streaming) változatban.
+# Az accSmooth[0] utolsó window mintájára illesztett egyenes legfrissebb értékét
+# hasonlítja a szórásból számolt küszöbhöz. A regresszióhoz és a szóráshoz szükséges
+# összegeket (Σy, Σxy, Σy²) gyűrűpufferen tartjuk karban, így egy minta feldolgozása O(1),
+# és nem kell hozzá se numpy, se scipy.
+class DirectionClassifier:
+    def __init__(self, window=10, min_threshold=0.05, std_factor=1.2, resync=1024):
+        self.window = window
+        self.min_threshold = min_threshold
+        self.std_factor = std_factor
+        self.resync = resync  # ennyi mintánként újraszámoljuk az összegeket a kerekítési hibák miatt
+        self.buffer = [0.0] * window
+        self.head = 0  # a legrégebbi minta helye a pufferben
+        self.n = 0
+        self.since_resync = 0
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.sum_yy = 0.0
+        self.previous_directions = 0
+        self.regressed = 0.0
+        self.threshold = min_threshold
+        self.direction = "Stationary"
+
+    def append(self, y):
+        if self.n < self.window:
+            # x = n lesz az új minta indexe
+            self.buffer[(self.head + self.n) % self.window] = y
+            self.sum_xy += self.n * y
+            self.n += 1
+        else:
+            # a legrégebbi (x = 0) kiesik, a többi indexe eggyel csökken
+            oldest = self.buffer[self.head]
+            self.buffer[self.head] = y
+            self.head = (self.head + 1) % self.window
+            self.sum_y -= oldest
+            self.sum_yy -= oldest * oldest
+            self.sum_xy -= self.sum_y
+            self.sum_xy += (self.window - 1) * y
+        self.sum_y += y
+        self.sum_yy += y * y
+
+        self.since_resync += 1
+        if self.since_resync >= self.resync:
+            self.recompute()
+
+    def recompute(self):
+        self.sum_y = self.sum_xy = self.sum_yy = 0.0
+        for x in range(self.n):
+            y = self.buffer[(self.head + x) % self.window]
+            self.sum_y += y
+            self.sum_xy += x * y
+            self.sum_yy += y * y
+        self.since_resync = 0
+
+    # Az illesztett egyenes értéke a legfrissebb mintánál (x = n - 1)
+    def regressed_value(self):
+        n = self.n
+        if n < 2:
+            return self.buffer[self.head] if n else 0.0
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        slope = (n * self.sum_xy - sum_x * self.sum_y) / (n * sum_xx - sum_x * sum_x)
+        intercept = (self.sum_y - slope * sum_x) / n
+        return slope * (n - 1) + intercept
+
+    # Populációs szórás, mint az np.std
+    def std(self):
+        if not self.n:
+            return 0.0
+        mean = self.sum_y / self.n
+        return math.sqrt(max(0.0, self.sum_yy / self.n - mean * mean))
+
+    def update(self, y):
+        self.append(y)
+        self.regressed = self.regressed_value()
+        self.threshold = max(self.min_threshold, self.std() * self.std_factor)
+
+        if self.regressed > self.threshold:
+            self.direction = "Forward"
+            self.previous_directions = 1
+        elif self.regressed < -self.threshold:
+            self.direction = "Backward"
+            self.previous_directions = -1
+        elif self.previous_directions != 0:
+            self.direction = "Forward" if self.previous_directions > 0 else "Backward"
+        else:
+            self.direction = "Stationary"
+        return self.direction
@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import sweep_runner
+
+# Hajtás-összehasonlító benchmark: ugyanaz a drift vezérlő (és ugyanazok az erősítések)
+# minden alkatrész-konfiguráción (sweep_runner.PART_CONFIGS: RWD / AWD / FWD), vezérlőnként és
+# seedenként egy-egy futással. Az eredmény egy JSON fájl (a futtatás adataival), amit egy
+# korábbihoz (--baseline) hasonlítva a romlásokat megjelöljük.
+
+# mérőszám -> melyik irány a jobb; a None (meg sem történt) esemény a legjobb / legrosszabb
+LOWER_IS_BETTER = ["rmse", "radius_cv", "radius_drift", "time_to_drift", "control_p95_ms"]
+HIGHER_IS_BETTER = ["time_to_overheat"]
+# ennyivel lehet rosszabb (relatív, abszolút) egy mérőszám, mielőtt romlásnak számít;
+# a késleltetés a gép terhelésétől is függ, ott tágabb a tűrés
+TOLERANCE = {"control_p95_ms": (0.5, 0.5)}
+DEFAULT_TOLERANCE = (0.1, 0.05)
+
+
+def make_jobs(part_configs, controllers, seeds, level="smallgrid", **gains):
+    return [{"level": level, "part_config": part_config, "controller": controller, "seed": seed,
+             "gains": dict(gains)}
+            for part_config in part_configs for controller in controllers for seed in seeds]
+
+
+def run_key(row):
+    return f'{row["level"]}/{row["part_config"]}/{row["controller"]}/{row["seed"]}'
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Romlások a baseline-hoz képest: (futás, mérőszám, régi, új) listában. Ha egy esemény
+# (time_to_drift) eddig megtörtént és most nem, az is romlás; ha a futás hiányzik, azt kihagyjuk.
+def compare(results, baseline):
+    old_runs = {run_key(row): row for row in baseline["runs"]}
+    regressions = []
+    for row in results["runs"]:
+        old = old_runs.get(run_key(row))
+        if old is None:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            before, after = old.get(metric), row.get(metric)
+            relative, absolute = TOLERANCE.get(metric, DEFAULT_TOLERANCE)
+            if metric in HIGHER_IS_BETTER:
+                # soha túl nem melegedni a legjobb eset
+                worse = after is not None and (before is None or after < before * (1 - relative) - absolute)
+            else:
+                worse = before is not None and (after is None or after > before * (1 + relative) + absolute)
+            if worse:
+                regressions.append((run_key(row), metric, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drivetrain comparison benchmark (FWD / AWD / RWD)")
+    parser.add_argument("--backend", choices=["local", "beamng"], default="local")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--base-port", type=int, default=25252)
+    parser.add_argument("--home", default=sweep_runner.fifth_test.BEAMNG_HOME)
+    parser.add_argument("--level", default="smallgrid")
+    parser.add_argument("--part-configs", nargs="+", default=list(sweep_runner.PART_CONFIGS),
+                        choices=list(sweep_runner.PART_CONFIGS))
+    parser.add_argument("--controllers", nargs="+", default=["normalization", "pid"],
+                        choices=["normalization", "pid"])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1703])
+    parser.add_argument("--desired-yaw-rate", type=float, default=2.0)
+    parser.add_argument("--output", default=time.strftime("benchmarks/drivetrain_%Y%m%d_%H%M%S.json"))
+    parser.add_argument("--baseline", help="earlier results file; regressions make the exit code 1")
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.part_configs, args.controllers, args.seeds, args.level,
+                     desired_yaw_rate=args.desired_yaw_rate)
+    start = time.perf_counter()
+    rows = sweep_runner.run_sweep(jobs, args.backend, args.ticks, args.workers, args.base_port, args.home)
+    for row in rows:
+        del row["worker"]
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "backend": args.backend,
+        "ticks": args.ticks,
+        "runs": rows,
+    }
+    sweep_runner.print_table(rows)
+    print(f"{len(rows)} runs in {time.perf_counter() - start:.1f} s")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"results: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline["backend"], baseline["ticks"]) != (args.backend, args.ticks):
+            print(f'warning: baseline was run with {baseline["backend"]} / {baseline["ticks"]} ticks')
+        regressions = compare(results, baseline)
+        for key, metric, before, after in regressions:
+            print(f"REGRESSION {key} {metric}: {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+
+if __name__ == "__main__":
+    main()
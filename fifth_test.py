@@ -1,40 +1,84 @@
+import sys
 import time
 import random
 import math
 import logging
 
-from beamngpy import BeamNGpy, Scenario, Vehicle, set_up_simple_logging
-from beamngpy.sensors import AdvancedIMU, Electrics, Sensor, PowertrainSensor
-
-# Ez a függvény csak annyit szolgál, ha az autó motorja elkezdene túlmelegedni,
-# akkor kicsit abbahagyja a driftelést, hogy visszahűljön
-def cooling(vehicle):
-    vehicle.control(steering=0, throttle=0.2, brake=0, parkingbrake=0,clutch=0, gear=3)
-    electrics_data = vehicle.sensors["electrics"]
-    while electrics_data["water_temperature"] > 91:
-        vehicle.sensors.poll()
-        electrics_data = vehicle.sensors["electrics"]
-    while round(electrics_data["wheelspeed"],1) != 0:
-        vehicle.sensors.poll()
-        electrics_data = vehicle.sensors["electrics"]
-        vehicle.control(steering=0, throttle=0, brake=1)
-    time.sleep(5)
-    left_circle(vehicle) if random.randint(0, 1) == 0 else right_circle(vehicle)
-
+from beamngpy import set_up_simple_logging
+from beamngpy.sensors import AdvancedIMU, Camera, Electrics, Lidar
+
+from rolling_normalizer import RollingNormalizer
+from stepped_loop import SteppedRunner
+from telemetry_recorder import TelemetryRecorder
+from cooling_state import CoolingStateMachine
+from sensor_pipeline import SensorPipeline
+from tick_profiler import TickProfiler
+from telemetry_log import TelemetryLogger
+from session_manager import DriftSession
+from state_estimator import StateEstimator
+from imu_batch import ImuBatch
+from figure_eight import FigureEightScheduler
+from circle_fit import CircleFitter
+from lidar_edges import LidarEdgeDetector, points_from_raw
+from camera_pipeline import CameraPipeline
+from actuation import Actuator
+from traction_monitor import TractionMonitor
+
+# bemenetenként a megengedett változás másodpercenként (actuation.Actuator), pl. {"steering": 8.0};
+# a control_loop bang-bang jellegű kormányzását egy kormány-slew lelassítaná, ezért alapból nincs
+SLEW_RATE = {}
+
+BEAMNG_HOME = "D:/BeamNG.tech.v0.35.5.0/BeamNG.tech.v0.35.5.0"
+
+# etk800, hátsókerék-hajtás aktív LSD-vel, drift kormánnyal
+PART_CONFIG = {
+    "etk800_differential_R": "etk800_differential_R_active_LSD",
+    "etk800_radiator": "etk800_radiator_high_performance",
+    "etk800_steering_wide":"etk800_steering_wide_drift",
+    "etk_engine":"etk_engine_v8_4.4_petrol",
+    "etk_intake_v8_4.4_petrol":"etk_intake_v8_4.4_petrol_rennspecht",
+    "etk_DSE_drivemodes_default":"etk_DSE_drivemodes_default_off",
+    }
+
+# várakozás: valós időben time.sleep, --stepped módban fizikai lépések
+wait = time.sleep
+
+# késleltetésmérés a tick szakaszaira, --profile kapcsolja be
+profiler = TickProfiler(enabled=False)
+
+# napló háttérszálon: a vezérlési adatokat legfeljebb 10 Hz-cel, a hűtést 1 Hz-cel írjuk ki
+log = TelemetryLogger(rates={"control": 10, "cooling": 1, "maneuver": 10, "camera": 2, "traction": 10})
+
+# a kör irányát adják vissza: a yaw_rate várt előjele (left_circle: pozitív, right_circle: negatív)
 def left_circle(vehicle):
     vehicle.control(steering=-1, throttle=1, brake=0, parkingbrake=0,clutch=0, gear=3)
-    time.sleep(2)
+    wait(2)
+    return 1
 
 def right_circle(vehicle):
     vehicle.control(steering=1, throttle=1, brake=0, parkingbrake=0,clutch=0, gear=3)
-    time.sleep(2)
+    wait(2)
+    return -1
+
+# a random dönti el, balra vagy jobbra indul a kör; a kör irányát adja vissza
+def launch_circle(vehicle):
+    return left_circle(vehicle) if random.randint(0, 1) == 0 else right_circle(vehicle)
 
 
 # ebben a függvényben kérem le a különböző adatokat a szenzorokból
-def get_data(vehicle, imu, data_dict, yaw_rates, velocities):
-    vehicle.sensors.poll()
-    electrics_data = vehicle.sensors["electrics"]
-    imu_data = imu.poll()[0.0]
+# az IMU poll összes (100 Hz-es) mintája egy ImuBatch-be kerül, a tick értékei a legfrissebből jönnek
+# estimator: StateEstimator, ha meg van adva, a sideslip / sebesség / heading becslést is kitölti,
+# a tick óta érkezett összes mintával
+# circle: CircleFitter, ha meg van adva, a pos mintákra illesztett kör és a spirál driftjei
+# traction: TractionMonitor, ha meg van adva, mintánként figyeli a tapadásvesztést (a kormány az
+# előző tickben kiküldött érték)
+def get_data(vehicle, imu, data_dict, yaw_rates, velocities, estimator=None, circle=None, traction=None):
+    with profiler.span("electrics_poll"):
+        vehicle.sensors.poll()
+        electrics_data = vehicle.sensors["electrics"]
+    with profiler.span("imu_poll"):
+        batch = ImuBatch(imu.poll(), since=data_dict.get("time"))
+    imu_data = batch.latest()
 
     speed = electrics_data["virtualAirspeed"]
     yaw_rate = imu_data["angVel"][2]
@@ -55,6 +99,39 @@ def get_data(vehicle, imu, data_dict, yaw_rates, velocities):
     data_dict["water_temp"] = water_temp
     data_dict["wheelspeed"] = wheelspeed
     data_dict["turn_direction"] = turn_direction
+    data_dict["time"] = imu_data["time"]
+    data_dict["imu_samples"] = len(batch)
+    data_dict["pos_x"] = imu_data["pos"][0]
+    data_dict["pos_y"] = imu_data["pos"][1]
+
+    if estimator is not None:
+        with profiler.span("estimator"):
+            estimator.update_batch(batch)
+        data_dict["sideslip"] = estimator.sideslip
+        data_dict["v_long"] = estimator.v_long
+        data_dict["v_lat"] = estimator.v_lat
+        data_dict["heading"] = estimator.heading
+        data_dict["yaw_rate_estimate"] = estimator.yaw_rate
+
+    if circle is not None:
+        with profiler.span("circle_fit"):
+            circle.update_batch(batch)
+        data_dict["circle_valid"] = circle.valid
+        data_dict["circle_center_x"] = circle.center_x
+        data_dict["circle_center_y"] = circle.center_y
+        data_dict["circle_radius"] = circle.radius
+        data_dict["radius_drift"] = circle.radius_drift
+        data_dict["center_drift"] = circle.center_drift
+
+    if traction is not None:
+        with profiler.span("traction"):
+            new_event = traction.update_batch(batch, data_dict.get("steering", 0.0), speed,
+                                              electrics_data["wheelspeed"])
+        data_dict.update(traction.state())
+        if new_event:
+            event = traction.events[-1]
+            log.log("traction", cause=event["cause"], confidence=event["confidence"],
+                    latency_ms=event["latency_ms"])
 
     # Logoláshoz és normalizáláshoz gyűjtjük őket külön is
     yaw_rates.append(yaw_rate)
@@ -62,50 +139,154 @@ def get_data(vehicle, imu, data_dict, yaw_rates, velocities):
 
 
 
+# LIDAR szkenből a legközelebbi pályaszél és a szabad irány (lidar_edges.py), a get_data után,
+# mert az autó helyzete és headingje kell hozzá. A pontfelhőt másolás nélkül olvassuk (poll_raw).
+def get_lidar_data(lidar, detector, data_dict):
+    with profiler.span("lidar_poll"):
+        raw = lidar.poll_raw()
+    with profiler.span("lidar_edges"):
+        detector.update(points_from_raw(raw, lidar.is_streaming), data_dict["pos_x"], data_dict["pos_y"],
+                        data_dict.get("heading", 0.0))
+    data_dict.update(detector.state())
+
+
+# Kamerakép a worker processznek (camera_pipeline.py), és a legutóbbi kész eredménye:
+# pályagörbület és oldalirányú eltérés. A vezérlő szálán csak egy memóriamásolás történik.
+def get_camera_data(camera, pipeline, data_dict):
+    with profiler.span("camera_poll"):
+        raw = camera.poll_raw()
+    with profiler.span("camera_publish"):
+        pipeline.publish(raw.get("colour"))
+        result = pipeline.result()
+    if result is not None:
+        data_dict.update(result)
+        log.log("camera", curvature=result["camera_curvature"], offset=result["camera_offset"],
+                confidence=result["camera_confidence"], latency=result["camera_latency"])
+
+
+# ha van LIDAR, az autó előtti pályaszél közelében visszavesszük a gázt: slow_distance alatt
+# arányosan, stop_distance-nél már nincs gáz. Csak az előttünk lévő akadály számít, a mellettünk
+# vagy mögöttünk lévő fal (amitől épp távolodunk) nem
+def edge_throttle(data_dict, throttle, stop_distance=3.0, slow_distance=10.0):
+    distance = data_dict.get("lidar_ahead_distance")
+    if distance is None:
+        return throttle
+    return throttle * min(1.0, max(0.0, (distance - stop_distance) / (slow_distance - stop_distance)))
+
+
+# a hűtést a cooling_state végzi: ha a motor túlmelegszik, amíg vissza nem hűl és újra
+# nem indul a körözés, ő irányítja az autót, és a driftelő vezérlés kimarad (True)
+# cooling_state=None: a hívó ebben a tickben már lefuttatta (a fifth_test fő ciklusa a manőver előtt)
+def handle_cooling(vehicle, data_dict, cooling_state):
+    if cooling_state is None:
+        return False
+    water_temp = data_dict["water_temp"]
+    with profiler.span("cooling"):
+        cooling = cooling_state.update(vehicle, water_temp, data_dict["wheelspeed"], data_dict["time"])
+    if cooling:
+        data_dict["steering"] = cooling_state.command.get("steering", 0)
+        data_dict["throttle"] = cooling_state.command.get("throttle", 0)
+        data_dict["brake"] = cooling_state.command.get("brake", 0)
+        log.log("cooling", state=cooling_state.state, water_temp=water_temp)
+    return cooling
+
 # itt történnek az autó irányíztásához szükséges zámítások
-def control_loop(vehicle, data_dict, yaw_rates, velocities):
+# a kísérleti paraméterek kívülről is megadhatók (sweep_runner, hangolás)
+def control_loop(vehicle, data_dict, yaw_rates, velocities, cooling_state,
+                 desired_yaw_rate=2, aggression=2, error_threshold=0.1, throttle_floor=0.3):
     yaw_rate = data_dict["yaw_rate"]
     velocity = data_dict["velocity"]
-    water_temp = data_dict["water_temp"]
 
     # Hőmérséklet figyelése
-    if water_temp  > 115:
-        cooling(vehicle)
+    if handle_cooling(vehicle, data_dict, cooling_state):
+        return
 
-    desired_yaw_rate = 2
     # Hiba kiszámítása: kívánt yaw_rate - mért yaw_rate
     error = desired_yaw_rate - abs(yaw_rate)
-    print("yaw_rate:", yaw_rate)
-    print("error:", error)
 
     # Gázpedál szabályozás: ha a drift hiba vagy a velocity nagy, csökkentsük a throttle-t
     # Például: ha az abs(error) meghalad egy küszöböt, csökkentsünk
-    error_threshold = 0.1  # ez egy kísérleti küszöb (rad/s-ben)
+    # error_threshold: kísérleti küszöb (rad/s-ben)
     if abs(error) > error_threshold:
-        throttle = max(0.3, 1 - abs(error)*2)  # egyszerű szabályozás
+        throttle = max(throttle_floor, 1 - abs(error)*2)  # egyszerű szabályozás
     else:
         throttle = 1.0
-    print("Throttle:", throttle)
+    throttle = edge_throttle(data_dict, throttle)
 
     #Vezérlés normalizálva -1 és 1 közé
     steering = 0
+    normalized_yaw_rate = 0
+    normalized_velocity = 0
     if len(yaw_rates) > 1:
-        normalized_yaw_rate = -1 + 2 * ((yaw_rate - min(yaw_rates)) / (max(yaw_rates) - min(yaw_rates)))
-        normalized_velocity = -1 + 2 * ((velocity - min(velocities)) / (max(velocities) - min(velocities)))
-
-        print("Normalized_yaw_rate: ", normalized_yaw_rate)
-        print("Normalized_velocity: ", normalized_velocity)
-        aggression = 2
+        normalized_yaw_rate = yaw_rates.normalize(yaw_rate)
+        normalized_velocity = velocities.normalize(velocity)
         steering = (normalized_yaw_rate*aggression)+normalized_velocity
-        print("Steering:", steering)
 
-    if len(yaw_rates) > 20:
-        yaw_rates.pop(0)
-        velocities.pop(0)
+    log.log("control", yaw_rate=yaw_rate, error=error, throttle=throttle, steering=steering,
+            normalized_yaw_rate=normalized_yaw_rate, normalized_velocity=normalized_velocity,
+            radius_drift=data_dict.get("radius_drift", 0.0))
+
+    data_dict["steering"] = steering
+    data_dict["throttle"] = throttle
+    data_dict["brake"] = 0
+    data_dict["desired_yaw_rate"] = math.copysign(desired_yaw_rate, yaw_rate)
 
     # Küldjük el a vezérlési parancsokat
-    vehicle.control(steering=steering, throttle=throttle, brake=0)
-    print("--------------------------")
+    with profiler.span("vehicle_control"):
+        vehicle.control(steering=steering, throttle=throttle, brake=0)
+
+
+# a control_loop helyett MPC-vel (mpc_controller.py) számolja a kormányzást és a gázt
+def mpc_control_loop(vehicle, data_dict, controller, cooling_state):
+    if handle_cooling(vehicle, data_dict, cooling_state):
+        return
+
+    with profiler.span("mpc"):
+        steering, throttle = controller.update(data_dict["yaw_rate"], data_dict["speed"],
+                                               data_dict.get("sideslip", 0.0))
+    throttle = edge_throttle(data_dict, throttle)
+    data_dict["steering"] = steering
+    data_dict["throttle"] = throttle
+    data_dict["brake"] = 0
+    data_dict["desired_yaw_rate"] = controller.direction * controller.desired_yaw_rate
+    log.log("control", yaw_rate=data_dict["yaw_rate"], steering=steering, throttle=throttle)
+
+    with profiler.span("vehicle_control"):
+        vehicle.control(steering=steering, throttle=throttle, brake=0)
+
+
+# third_test.py PID kormányzása (gain_tuner hangolja), a dt a szimulátor idejéből
+# pid_state: {"integral": 0.0, "prev_error": 0.0, "prev_time": None}
+def pid_control_loop(vehicle, data_dict, pid_state, cooling_state, Kp=0.5, Ki=0.1, Kd=0.05,
+                     desired_yaw_rate=-2, error_threshold=0.1, throttle_floor=0.5):
+    if handle_cooling(vehicle, data_dict, cooling_state):
+        return
+
+    now = data_dict["time"]
+    prev_time = pid_state["prev_time"]
+    dt = now - prev_time if prev_time is not None and now - prev_time > 0 else 0.01
+    pid_state["prev_time"] = now
+
+    error = desired_yaw_rate - data_dict["yaw_rate"]
+    pid_state["integral"] += error * dt
+    error_derivative = (error - pid_state["prev_error"]) / dt
+    pid_state["prev_error"] = error
+    steering = Kp * error + Ki * pid_state["integral"] + Kd * error_derivative
+
+    if abs(error) > error_threshold:
+        throttle = max(throttle_floor, 1 - abs(error) * 5)
+    else:
+        throttle = 1.0
+    throttle = edge_throttle(data_dict, throttle)
+
+    data_dict["steering"] = steering
+    data_dict["throttle"] = throttle
+    data_dict["brake"] = 0
+    data_dict["desired_yaw_rate"] = desired_yaw_rate
+    log.log("control", yaw_rate=data_dict["yaw_rate"], error=error, steering=steering, throttle=throttle)
+
+    with profiler.span("vehicle_control"):
+        vehicle.control(steering=steering, throttle=throttle, brake=0)
 
 
 # tul gyorsan dobodik at a masik iranyba igy nem fankot csinal hanem egy oriasi felkor driftet
@@ -115,83 +296,163 @@ def change_direction_calculate(yaw_rate):
     if abs(yaw_rate) > 1.2:
         return "Right" if yaw_rate > 0 else "Left"
 
-def change_direction(vehicle, imu, data_dict, yaw_rates, velocities):
-    current_direction = data_dict["turn_direction"]
-    desired_direction = "Left" if current_direction == "Right" else "Right"
-
-    # Állítsuk be a vezérlést az ellenkező irányba, 30% gázzal
-    if desired_direction == "Left":
-        vehicle.control(steering=1, throttle=0.3, brake=0.1)
-    else:
-        vehicle.control(steering=-1, throttle=0.3, brake=0.1)
-
-    # Frissítsük folyamatosan az adatokat, amíg el nem érjük a kívánt irányt
-    max_attempts = 200  # végtelen ciklus elkerülése végett
-    attempts = 0
-    while attempts < max_attempts:
-        get_data(vehicle, imu, data_dict, yaw_rates, velocities)
-        print("Current turning direction:", change_direction_calculate(data_dict["yaw_rate"]))
-        if change_direction_calculate(data_dict["yaw_rate"]) == desired_direction:
-            print("Direction change complete.")
-            break
-        time.sleep(0.1)
-        attempts += 1
-
 # fő függvény ahonnan indul, az elején pár konfiguráció
+# --stepped: a szimulátort megállítjuk és tickenként fix számú fizikai lépést léptetünk
+# --record: a telemetriát a telemetry/ mappába menti (telemetry_recorder.load_telemetry-vel tölthető vissza)
+# --async: a szenzorokat háttérszálak olvassák, a vezérlés mindig a legfrissebb mintát kapja
+# (a --stepped, --lidar és --camera kapcsolókkal együtt nem használható)
+# --profile: szakaszonkénti késleltetés (p50/p95/p99/max) kilépéskor vagy SIGUSR1 / Ctrl+Break jelzésre
+# --mpc: a control_loop helyett MPC vezérlés, 60 Hz-es tickkel
+# --dashboard: élő grafikonok külön processzben (live_dashboard.py), osztott memórián át
+# --lidar: 360°-os LIDAR, a pályaszél távolsága és a szabad irány a vezérlő állapotába kerül
+# --camera: előre néző kamera, a pálya görbülete és az autó oldalirányú eltérése (külön processzben)
 def main():
+    global wait
+    stepped = "--stepped" in sys.argv
+    controller = None
+    tick_period = 0.1
+    if "--mpc" in sys.argv:
+        from mpc_controller import MpcController  # numpy-t csak MPC-hez töltünk be
+
+        tick_period = 1 / 60
+        controller = MpcController(dt=tick_period)
+    use_pipeline = "--async" in sys.argv
+    if stepped and use_pipeline:
+        sys.exit("--stepped and --async cannot be used together")
+    # a LIDAR / kamera poll_raw ugyanazon a kapcsolaton megy, mint a pipeline szálának IMU pollja
+    if use_pipeline and ("--lidar" in sys.argv or "--camera" in sys.argv):
+        sys.exit("--async cannot be used together with --lidar or --camera")
+    # léptetett módban a frekvenciát és a késleltetést mindig kiírjuk
+    profiler.enabled = "--profile" in sys.argv or stepped
+    if profiler.enabled:
+        profiler.install_signal_handler()
+    recorder = None
+    if "--record" in sys.argv:
+        recorder = TelemetryRecorder(time.strftime("telemetry/%Y%m%d_%H%M%S"))
+    dashboard = None
+    if "--dashboard" in sys.argv:
+        from live_dashboard import TelemetryRing, start_dashboard  # numpy / matplotlib csak ehhez kell
+
+        dashboard = TelemetryRing.create()
+        start_dashboard(dashboard)
+        print(f"dashboard ring: {dashboard.name} (python live_dashboard.py {dashboard.name})")
     random.seed(1703)
     set_up_simple_logging()
     logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-    beamng = BeamNGpy("localhost", 25252, home="D:/BeamNG.tech.v0.35.5.0/BeamNG.tech.v0.35.5.0")
-    bng = beamng.open(launch=True)
-
-    scenario = Scenario("smallgrid","autonomous_drifting_demo",)
-    vehicle = Vehicle("ego_vehicle", model="etk800", license="SPEED-007", color="Blue")
+    # ha már fut a BeamNG, csatlakozunk hozzá, és a scenariót / alkatrészeket csak szükség esetén töltjük újra
+    session = DriftSession(BEAMNG_HOME, parts=PART_CONFIG).open()
+    bng, vehicle = session.bng, session.vehicle
 
-    scenario.add_vehicle(vehicle, pos=(0,0,0))
-    scenario.make(bng)
-
-    bng.settings.set_deterministic(60)  # Set simulator to 60hz temporal resolution
-
-    bng.scenario.load(scenario)
-    bng.scenario.start()
-
-    config = {
-        "etk800_differential_R": "etk800_differential_R_active_LSD",
-        "etk800_radiator": "etk800_radiator_high_performance",
-        "etk800_steering_wide":"etk800_steering_wide_drift",
-        "etk_engine":"etk_engine_v8_4.4_petrol",
-        "etk_intake_v8_4.4_petrol":"etk_intake_v8_4.4_petrol_rennspecht",
-        "etk_DSE_drivemodes_default":"etk_DSE_drivemodes_default_off",
-        }
-    vehicle.set_part_config({"parts":config})
-
-    imu = AdvancedIMU("accel1", bng, vehicle, gfx_update_time=0.01)
+    imu = imu_sensor = AdvancedIMU("accel1", bng, vehicle, gfx_update_time=0.01)
     electrics = Electrics()
     vehicle.sensors.attach("electrics", electrics)
     vehicle.set_shift_mode("realistic_automatic")
+    lidar = None
+    if "--lidar" in sys.argv:
+        lidar = Lidar("lidar1", bng, vehicle, requested_update_time=0.1, is_using_shared_memory=True,
+                      is_visualised=False)
+        lidar_detector = LidarEdgeDetector()
+    camera = camera_pipeline = None
+    if "--camera" in sys.argv:
+        camera = Camera("camera1", bng, vehicle, requested_update_time=0.05, pos=(0, -1.5, 1.4), dir=(0, -1, 0),
+                        resolution=(320, 240), is_using_shared_memory=True, is_render_annotations=False,
+                        is_render_depth=False)
+        camera_pipeline = CameraPipeline(320, 240).start()
+
+    runner = None
+    if stepped:
+        runner = SteppedRunner(bng, steps_per_tick=round(tick_period * 60), profiler=profiler)  # 60 Hz fizika
+        runner.start()
+        wait = runner.sleep
+
+    direction = launch_circle(vehicle)
+    if controller:
+        controller.direction = direction  # a kilövés iránya, az MPC ehhez tartja a driftet
+
+    pipeline = None
+    if use_pipeline:
+        pipeline = SensorPipeline(vehicle, imu)
+        pipeline.start()
+        vehicle, imu = pipeline.vehicle, pipeline.imu
 
-    
-    left_circle(vehicle) if random.randint(0, 1) == 0 else right_circle(vehicle)
-
-    yaw_rates = []
-    velocities = []
     data_dict = {}
-
-
-    i = 0
+    # a vezérlők és a hűtés / manőver parancsai ezen át mennek: vágás, slew, deadband, és csak a
+    # változás megy ki; a slew-hoz a szimulátor idejét használja
+    actuator = vehicle = Actuator(vehicle, slew_rate=SLEW_RATE, clock=lambda: data_dict.get("time", 0.0))
+    yaw_rates = RollingNormalizer(20)
+    velocities = RollingNormalizer(20)
+    cooling_state = CoolingStateMachine()
+    estimator = StateEstimator()
+    circle = CircleFitter()
+    traction = TractionMonitor()
+    # nyolcas: körönként irányváltás, a tickben, a hűtés alatt szünetel
+    maneuver = FigureEightScheduler()
 
     # végtelen ciklus, hogy ne hagyja abba az algoritmus az irányítást
-    # az i változó azt szolgálja, hogy mikor legyen az irányváltás
-    while True:
-        get_data(vehicle, imu, data_dict, yaw_rates, velocities)
-        control_loop(vehicle, data_dict, yaw_rates, velocities)
-        if i == 200:
-            change_direction(vehicle, imu, data_dict, yaw_rates, velocities)
-            i = 0
-        i+=1
-        time.sleep(0.1)
+    try:
+        while True:
+            if runner is not None:
+                runner.advance()
+            with profiler.span("get_data"):
+                get_data(vehicle, imu, data_dict, yaw_rates, velocities, estimator, circle, traction)
+            if lidar is not None:
+                get_lidar_data(lidar, lidar_detector, data_dict)
+            if camera is not None:
+                get_camera_data(camera, camera_pipeline, data_dict)
+            if pipeline is not None:
+                staleness = pipeline.staleness()
+                data_dict["imu_staleness"] = staleness["imu"]
+                data_dict["electrics_staleness"] = staleness["electrics"]
+            # a hűtés minden tickben előbb fut, így a túlmelegedés a nyolcas átmenetét is megszakítja
+            cooling = handle_cooling(vehicle, data_dict, cooling_state)
+            with profiler.span("maneuver"):
+                maneuvering = maneuver.update(vehicle, data_dict, paused=cooling)
+            with profiler.span("control_loop"):
+                if maneuvering:
+                    log.log("maneuver", state=maneuver.state, yaw_rate=data_dict["yaw_rate"])
+                elif cooling:
+                    pass
+                elif controller is not None:
+                    mpc_control_loop(vehicle, data_dict, controller, None)
+                else:
+                    control_loop(vehicle, data_dict, yaw_rates, velocities, None)
+                actuator.flush()
+                # a rögzített / kirajzolt értékek a ténylegesen kiküldöttek
+                data_dict.update(actuator.output)
+            if recorder is not None:
+                recorder.record(data_dict)
+            if dashboard is not None:
+                dashboard.write(data_dict)
+            profiler.tick()
+            if runner is None:
+                time.sleep(tick_period)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if profiler.enabled:
+            profiler.report()
+        log.close()
+        log.report()
+        actuator.report()
+        if controller is not None:
+            controller.report()
+        if pipeline is not None:
+            pipeline.report()
+            pipeline.stop()
+        if runner is not None:
+            runner.stop()
+        if recorder is not None:
+            recorder.close()
+        if dashboard is not None:
+            dashboard.close()
+        imu_sensor.remove()
+        if lidar is not None:
+            lidar.remove()
+        if camera is not None:
+            camera_pipeline.stop()
+            camera.remove()
+        session.close()
 
 if __name__ == "__main__":
     main()
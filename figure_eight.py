@@ -0,0 +1,109 @@
+import math
+
+from state_estimator import wrap_angle
+
+WAITING = "WAITING"
+LEFT_DONUT = "LEFT_DONUT"
+TRANSITION = "TRANSITION"
+RIGHT_DONUT = "RIGHT_DONUT"
+
+# yaw_rate előjele körönként: a left_circle (steering=-1) pozitív, a right_circle negatív yaw_rate-et ad
+DONUT_SIGN = {LEFT_DONUT: 1, RIGHT_DONUT: -1}
+
+
+# Nyolcas (∞) manőver a régi change_direction + i == 200 helyett, nem blokkoló állapotgépként:
+# bal kör -> átmenet -> jobb kör -> átmenet -> bal kör ...
+# Köridőben a driftelő vezérlő (control_loop / MPC) tartja a kört, a scheduler csak a
+# megtett szöget számolja a heading (vagy a yaw_rate integrálja) alapján. Ha a kör majdnem
+# teljes (laps * 2π - lead), átmenetbe lép: ellenkormány, kevés gáz, kis fék, amíg a yaw_rate
+# előjelet nem vált és el nem éri a switch_yaw_rate-et - ekkor már a másik körben vagyunk.
+# A lead miatt az átmenet a kör kezdőpontja előtt indul, így a két kör a kiindulási pont
+# körül ér össze, és nem fut ki egy nagy félkörbe.
+# Minden tickben egyszer kell meghívni (mint a CoolingStateMachine-t), True-t ad vissza,
+# ha ebben a tickben ő irányítja az autót.
+class FigureEightScheduler:
+    def __init__(self, laps=1.0, lead=0.6, switch_yaw_rate=1.2, transition_steering=1.0,
+                 transition_throttle=0.6, transition_brake=0.0, transition_seconds=5.0):
+        self.laps = laps  # ennyi kört tesz meg egy irányban
+        self.lead = lead  # ennyi radiánnal a teljes kör előtt kezdi az átmenetet
+        self.switch_yaw_rate = switch_yaw_rate  # e fölött a másik irányban már driftel
+        self.transition_steering = transition_steering
+        self.transition_throttle = transition_throttle
+        self.transition_brake = transition_brake
+        self.transition_seconds = transition_seconds  # ha eddig nem sikerül, a mostani irányban marad
+        self.state = WAITING
+        self.target = None  # az átmenet célköre
+        self.entered = 0.0
+        self.turned = 0.0  # a kör kezdete óta megtett szög (előjel nélkül)
+        self.last_heading = None
+        self.last_time = None
+        self.switches = 0
+        self.failed_switches = 0
+        self.command = {}
+
+    @property
+    def active(self):
+        return self.state == TRANSITION
+
+    def enter(self, state, now):
+        self.state = state
+        self.entered = now
+        self.turned = 0.0
+
+    def send(self, vehicle, **command):
+        self.command = command
+        vehicle.control(**command)
+
+    # a heading változása a legutóbbi tick óta: a becsült headingből, ha van, különben a yaw_rate-ből
+    def heading_change(self, data_dict):
+        now = data_dict["time"]
+        heading = data_dict.get("heading")
+        if heading is not None:
+            change = wrap_angle(heading - self.last_heading) if self.last_heading is not None else 0.0
+        else:
+            change = data_dict["yaw_rate"] * (now - self.last_time) if self.last_time is not None else 0.0
+        self.last_heading = heading
+        self.last_time = now
+        return change
+
+    def donut_for(self, yaw_rate):
+        return LEFT_DONUT if yaw_rate > 0 else RIGHT_DONUT
+
+    # paused: ha más (pl. a hűtés) vezeti az autót, újrakezdjük, és a következő körtől számolunk
+    def update(self, vehicle, data_dict, paused=False):
+        now = data_dict["time"]
+        yaw_rate = data_dict["yaw_rate"]
+        change = self.heading_change(data_dict)
+
+        if paused:
+            self.enter(WAITING, now)
+            return False
+
+        if self.state == WAITING:
+            if abs(yaw_rate) >= self.switch_yaw_rate:
+                self.enter(self.donut_for(yaw_rate), now)
+            return False
+
+        if self.state in DONUT_SIGN:
+            self.turned += change * DONUT_SIGN[self.state]
+            if self.turned < self.laps * 2 * math.pi - self.lead:
+                return False
+            self.target = RIGHT_DONUT if self.state == LEFT_DONUT else LEFT_DONUT
+            self.enter(TRANSITION, now)
+            # steering=-1 pozitív yaw_rate-et ad, úgyhogy a célkör előjelével ellentétesen kormányzunk
+            self.send(vehicle, steering=-DONUT_SIGN[self.target] * self.transition_steering,
+                      throttle=self.transition_throttle, brake=self.transition_brake)
+            data_dict.update(self.command)
+            return True
+
+        # TRANSITION
+        if yaw_rate * DONUT_SIGN[self.target] >= self.switch_yaw_rate:
+            self.switches += 1
+            self.enter(self.target, now)
+            return False
+        if now - self.entered >= self.transition_seconds:
+            self.failed_switches += 1
+            self.enter(WAITING, now)
+            return False
+        data_dict.update(self.command)
+        return True
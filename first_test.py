@@ -2,27 +2,21 @@ import random
 from time import sleep
 import math
 
-from beamngpy import BeamNGpy, Scenario, Vehicle, set_up_simple_logging
+from beamngpy import set_up_simple_logging
 from beamngpy.sensors import AdvancedIMU, Electrics, Sensor, PowertrainSensor
 
+from rolling_normalizer import RollingNormalizer
+from session_manager import DriftSession
+from imu_batch import ImuBatch
+
 
 def main():
     random.seed(1703)
     set_up_simple_logging()
 
-    beamng = BeamNGpy("localhost", 25252, home="F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0")
-    bng = beamng.open(launch=True)
-
-    scenario = Scenario("smallgrid","autonomous_drifting_demo",)
-    vehicle = Vehicle("ego_vehicle", model="etk800", license="SPEED-007", color="Blue")
-
-    scenario.add_vehicle(vehicle, pos=(0,0,0))
-    scenario.make(bng)
-
-    bng.settings.set_deterministic(60)  # Set simulator to 60hz temporal resolution
-
-    bng.scenario.load(scenario)
-    bng.scenario.start()
+    # ha már fut a BeamNG, csatlakozunk hozzá, és a scenariót / alkatrészeket csak szükség esetén töltjük újra
+    session = DriftSession("F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0").open()
+    bng, vehicle = session.bng, session.vehicle
 
     # NOTE: Create sensor after scenario has started.
     imu = AdvancedIMU("accel1", bng, vehicle, gfx_update_time=0.01)
@@ -36,21 +30,21 @@ def main():
     vehicle.control(steering=-1, throttle=1, brake=0, parkingbrake=0,clutch=0, gear=2)
     sleep(2.5)
 
-    yaw_rates = []
-    velocities = []
+    yaw_rates = RollingNormalizer(20)
+    velocities = RollingNormalizer(20)
     while True:
         sleep(0.1)  # Include a small delay between each reading.
-        data = imu.poll()  # Fetch the latest readings from the sensor.
+        data = ImuBatch(imu.poll()).latest()  # Fetch the latest readings from the sensor.
 
-        velocity = data[0.0]["angAccel"][2]
+        velocity = data["angAccel"][2]
         velocities.append(velocity)
 
-        yaw_rate = data[0.0]["angVel"][2]
+        yaw_rate = data["angVel"][2]
         yaw_rates.append(yaw_rate)
 
         if len(yaw_rates) > 1:
-            normalized_yaw_rate = -1 + 2 * ((yaw_rate - min(yaw_rates)) / (max(yaw_rates) - min(yaw_rates)))
-            normalized_velocity = -1 + 2 * ((velocity - min(velocities)) / (max(velocities) - min(velocities)))
+            normalized_yaw_rate = yaw_rates.normalize(yaw_rate)
+            normalized_velocity = velocities.normalize(velocity)
 
             aggression = 2
             steering = (normalized_yaw_rate*aggression)+normalized_velocity
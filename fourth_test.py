@@ -1,27 +1,19 @@
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy.stats import linregress
 import time
 import random
 import math
 import logging
 
-from beamngpy import BeamNGpy, Scenario, Vehicle, set_up_simple_logging
+from beamngpy import set_up_simple_logging
 from beamngpy.sensors import AdvancedIMU, Electrics, Sensor, PowertrainSensor
 
-def cooling(vehicle):
-    vehicle.control(steering=0, throttle=0.2, brake=0, parkingbrake=0,clutch=0, gear=3)
-    electrics_data = vehicle.sensors["electrics"]
-    while electrics_data["water_temperature"] > 91:
-        vehicle.sensors.poll()
-        electrics_data = vehicle.sensors["electrics"]
-    while round(electrics_data["wheelspeed"],1) != 0:
-        vehicle.sensors.poll()
-        electrics_data = vehicle.sensors["electrics"]
-        vehicle.control(steering=0, throttle=0, brake=1)
-    time.sleep(5)
-    vehicle.control(steering=-1, throttle=1, brake=0)
-    time.sleep(2)
+from rolling_normalizer import RollingNormalizer
+from session_manager import DriftSession
+from imu_batch import ImuBatch
+from cooling_state import CoolingStateMachine
+from telemetry_log import TelemetryLogger
+
+# napló háttérszálon, a vezérlési adatok legfeljebb 10 Hz-cel
+log = TelemetryLogger(rates={"control": 10})
 
 def left_circle(vehicle):
     vehicle.control(steering=-1, throttle=1, brake=0, parkingbrake=0,clutch=0, gear=3)
@@ -31,17 +23,17 @@ def right_circle(vehicle):
     vehicle.control(steering=1, throttle=1, brake=0, parkingbrake=0,clutch=0, gear=3)
     time.sleep(2)
 
-def control_loop(vehicle, imu, yaw_rates, velocities):
+def control_loop(vehicle, imu, yaw_rates, velocities, cooling_state):
     vehicle.sensors.poll()
     # Lekérjük az adatok legfrissebb állapotát
     electrics_data = vehicle.sensors["electrics"]
     speed = electrics_data["virtualAirspeed"]
 
-    data = imu.poll()[0.0]
+    data = ImuBatch(imu.poll()).latest()
 
-    # Hőmérséklet figyelése
-    if electrics_data["water_temperature"] > 115:
-        cooling(vehicle)
+    # Hőmérséklet figyelése, hűtés közben nem driftelünk
+    if cooling_state.update(vehicle, electrics_data["water_temperature"], electrics_data["wheelspeed"], data["time"]):
+        return
 
     # Szenzoradatok: az angVel[2] a yaw_rate
     yaw_rate = data["angVel"][2]
@@ -54,8 +46,6 @@ def control_loop(vehicle, imu, yaw_rates, velocities):
     desired_yaw_rate = 2
     # Hiba kiszámítása: kívánt yaw_rate - mért yaw_rate
     error = desired_yaw_rate - abs(yaw_rate)
-    print("yaw_rate:", yaw_rate)
-    print("error:", error)
 
     # Gázpedál szabályozás: ha a drift hiba vagy a velocity nagy, csökkentsük a throttle-t
     # Például: ha az abs(error) meghalad egy küszöböt, csökkentsünk
@@ -64,32 +54,27 @@ def control_loop(vehicle, imu, yaw_rates, velocities):
         throttle = max(0.3, 1 - abs(error)*2)  # egyszerű szabályozás
     else:
         throttle = 1.0
-    print("Throttle:", throttle)
 
     # Melyik irányba halad az auto
+    turn_direction = "Straight"
     if abs(yaw_rate) > 0.2:  # Ha van számottevő szögsebesség
         turn_direction = "Right" if yaw_rate > 0 else "Left"
-        print(turn_direction)
 
     #Vezérlés normalizálva -1 és 1 közé
     steering = 0
+    normalized_yaw_rate = 0
+    normalized_velocity = 0
     if len(yaw_rates) > 1:
-        normalized_yaw_rate = -1 + 2 * ((yaw_rate - min(yaw_rates)) / (max(yaw_rates) - min(yaw_rates)))
-        normalized_velocity = -1 + 2 * ((velocity - min(velocities)) / (max(velocities) - min(velocities)))
-
-        print("Normalized_yaw_rate: ", normalized_yaw_rate)
-        print("Normalized_velocity: ", normalized_velocity)
+        normalized_yaw_rate = yaw_rates.normalize(yaw_rate)
+        normalized_velocity = velocities.normalize(velocity)
         aggression = 2
         steering = (normalized_yaw_rate*aggression)+normalized_velocity
-        print("Steering:", steering)
 
-    if len(yaw_rates) > 20:
-        yaw_rates.pop(0)
-        velocities.pop(0)
+    log.log("control", yaw_rate=yaw_rate, error=error, throttle=throttle, turn=turn_direction, steering=steering,
+            normalized_yaw_rate=normalized_yaw_rate, normalized_velocity=normalized_velocity)
 
     # Küldjük el a vezérlési parancsokat
     vehicle.control(steering=steering, throttle=throttle)
-    print("--------------------------")
 
 
 def main():
@@ -97,27 +82,16 @@ def main():
     set_up_simple_logging()
     logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-    beamng = BeamNGpy("localhost", 25252, home="F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0")
-    bng = beamng.open(launch=True)
-
-    scenario = Scenario("smallgrid","autonomous_drifting_demo",)
-    vehicle = Vehicle("ego_vehicle", model="etk800", license="SPEED-007", color="Blue")
-
-    scenario.add_vehicle(vehicle, pos=(0,0,0))
-    scenario.make(bng)
-
-    bng.settings.set_deterministic(60)  # Set simulator to 60hz temporal resolution
-
-    bng.scenario.load(scenario)
-    bng.scenario.start()
-
     config = {
         "etk800_differential_R": "etk800_differential_R_active_LSD",
         "etk800_radiator": "etk800_radiator_high_performance",
         "etk800_steering_wide":"etk800_steering_wide_drift",
         "etk_engine":"etk_engine_v8_4.4_petrol",
         "etk_intake_v8_4.4_petrol":"etk_intake_v8_4.4_petrol_rennspecht"}
-    vehicle.set_part_config({"parts":config})
+
+    # ha már fut a BeamNG, csatlakozunk hozzá, és a scenariót / alkatrészeket csak szükség esetén töltjük újra
+    session = DriftSession("F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0", parts=config).open()
+    bng, vehicle = session.bng, session.vehicle
 
     imu = AdvancedIMU("accel1", bng, vehicle, gfx_update_time=0.01)
     electrics = Electrics()
@@ -127,12 +101,19 @@ def main():
     
     left_circle(vehicle) if random.randint(0, 1) == 0 else right_circle(vehicle)
 
-    yaw_rates = []
-    velocities = []
-
-    while True:
-        control_loop(vehicle, imu, yaw_rates, velocities)
-        time.sleep(0.1)
+    yaw_rates = RollingNormalizer(20)
+    velocities = RollingNormalizer(20)
+    cooling_state = CoolingStateMachine(relaunch_steering=-1)
+
+    try:
+        while True:
+            control_loop(vehicle, imu, yaw_rates, velocities, cooling_state)
+            time.sleep(0.1)
+    finally:
+        log.close()
+        imu.remove()
+        session.close()
+        log.report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,208 @@
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+import fifth_test
+import sweep_runner
+
+# Automatikus erősítés-hangolás CMA-ES-sel. A paramétereket a [0, 1] kockára normáljuk,
+# generációnként egy populációt értékelünk ki (a worker processzekben párhuzamosan),
+# és minden generáció után checkpointot írunk, amiből a keresés folytatható (--resume).
+# Felvett nyomvonalakon nem hangolunk: ott a vezérlő nem hat vissza a yaw_rate-re, így a követési
+# hiba minden jelöltre ugyanaz (a nyílt hurkú összehasonlításra a batch_eval való).
+
+# paraméter: (alsó határ, felső határ, kiinduló érték a scriptekből)
+SPACES = {
+    "normalization": {  # fifth_test.py control_loop
+        "desired_yaw_rate": (1.0, 3.0, 2.0),
+        "aggression": (0.0, 4.0, 2.0),
+        "error_threshold": (0.0, 0.5, 0.1),
+        "throttle_floor": (0.0, 1.0, 0.3),
+    },
+    "pid": {  # third_test.py
+        "Kp": (0.0, 2.0, 0.5),
+        "Ki": (0.0, 0.5, 0.1),
+        "Kd": (0.0, 0.2, 0.05),
+    },
+}
+
+
+# (mu/mu_w, lambda)-CMA-ES a [0, 1]^n térben. A mintákat a kockára vágva értékeljük ki,
+# a kilógás négyzetével büntetve. Az állapot JSON-ba menthető.
+class CmaEs:
+    def __init__(self, mean, sigma=0.2, population=None, seed=1703):
+        n = len(mean)
+        self.n = n
+        self.population = population or 4 + int(3 * math.log(n))
+        self.mu = self.population // 2
+        weights = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / np.sum(self.weights ** 2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+
+        self.mean = np.asarray(mean, dtype=float)
+        self.sigma = sigma
+        self.C = np.eye(n)
+        self.p_sigma = np.zeros(n)
+        self.p_c = np.zeros(n)
+        self.generation = 0
+        self.rng = np.random.default_rng(seed)
+
+    def ask(self):
+        eigenvalues, B = np.linalg.eigh(self.C)
+        D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        z = self.rng.standard_normal((self.population, self.n))
+        return self.mean + self.sigma * (z * D) @ B.T
+
+    def tell(self, samples, scores):
+        order = np.argsort(scores)[:self.mu]
+        selected = samples[order]
+        old_mean = self.mean
+        self.mean = self.weights @ selected
+        step = (self.mean - old_mean) / self.sigma
+
+        eigenvalues, B = np.linalg.eigh(self.C)
+        C_inv_sqrt = B @ np.diag(1 / np.sqrt(np.maximum(eigenvalues, 1e-20))) @ B.T
+        self.p_sigma = ((1 - self.cs) * self.p_sigma
+                        + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * C_inv_sqrt @ step)
+        norm = np.linalg.norm(self.p_sigma) / math.sqrt(1 - (1 - self.cs) ** (2 * (self.generation + 1)))
+        hsig = norm / self.chi_n < 1.4 + 2 / (self.n + 1)
+        self.p_c = (1 - self.cc) * self.p_c + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+
+        steps = (selected - old_mean) / self.sigma
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.p_c, self.p_c) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * (steps.T * self.weights) @ steps)
+        self.C = (self.C + self.C.T) / 2
+        self.sigma *= math.exp(self.cs / self.damps * (np.linalg.norm(self.p_sigma) / self.chi_n - 1))
+        self.generation += 1
+
+    def state(self):
+        return {
+            "mean": self.mean.tolist(),
+            "sigma": self.sigma,
+            "C": self.C.tolist(),
+            "p_sigma": self.p_sigma.tolist(),
+            "p_c": self.p_c.tolist(),
+            "generation": self.generation,
+            "population": self.population,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        es = cls(state["mean"], state["sigma"], state["population"])
+        es.C = np.array(state["C"])
+        es.p_sigma = np.array(state["p_sigma"])
+        es.p_c = np.array(state["p_c"])
+        es.generation = state["generation"]
+        es.rng.bit_generator.state = state["rng"]
+        return es
+
+
+def to_gains(space, x):
+    x = np.clip(x, 0, 1)
+    return {name: float(low + value * (high - low)) for (name, (low, high, _)), value in zip(space.items(), x)}
+
+
+def from_gains(space, gains):
+    return np.array([(gains[name] - low) / (high - low) for name, (low, high, _) in space.items()])
+
+
+# Zárt hurok a helyi szimulátoron vagy BeamNG-ben, a sweep_runner feladataiként. A pid-nek a
+# desired_yaw_rate nagyságát adjuk, az előjelét a run_job az indulás irányából (a seed szerint) adja.
+def evaluate_closed_loop(pool, controller, population, backend, ticks, target_yaw_rate, level, home):
+    if controller == "pid":
+        gains = [{**g, "desired_yaw_rate": target_yaw_rate} for g in population]
+    else:
+        gains = population
+    jobs = [{"level": level, "part_config": "rwd_active_lsd", "controller": controller,
+             "target_yaw_rate": target_yaw_rate, "gains": g} for g in gains]
+    rows = sweep_runner.run_jobs(pool, jobs, backend, ticks, home)
+    return [{**gains, "rmse": row["rmse"], "stability": row["radius_cv"]}
+            for gains, row in zip(population, rows)]
+
+
+def score(row, stability_weight):
+    return row["rmse"] + stability_weight * row["stability"]
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=1)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Population-based (CMA-ES) gain tuning")
+    parser.add_argument("--controller", choices=list(SPACES), default="normalization")
+    parser.add_argument("--backend", choices=["local", "beamng"], default="local")
+    parser.add_argument("--generations", type=int, default=10, help="total, including resumed ones")
+    parser.add_argument("--population", type=int, default=None)
+    parser.add_argument("--sigma", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1703)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--target-yaw-rate", type=float, default=2.0)
+    parser.add_argument("--stability-weight", type=float, default=1.0)
+    parser.add_argument("--level", default="smallgrid")
+    parser.add_argument("--base-port", type=int, default=25252)
+    parser.add_argument("--home", default=fifth_test.BEAMNG_HOME)
+    parser.add_argument("--checkpoint", default="gain_tuner_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="continue from --checkpoint")
+    args = parser.parse_args()
+
+    if args.resume:
+        with open(args.checkpoint) as f:
+            checkpoint = json.load(f)
+        args.controller = checkpoint["controller"]
+        es = CmaEs.from_state(checkpoint["es"])
+        print(f"Resuming {args.controller} tuning at generation {es.generation}")
+    else:
+        space = SPACES[args.controller]
+        es = CmaEs(from_gains(space, {name: default for name, (_, _, default) in space.items()}),
+                   args.sigma, args.population, args.seed)
+        checkpoint = {"controller": args.controller, "best": None, "history": []}
+    space = SPACES[args.controller]
+
+    with sweep_runner.worker_pool(args.workers, args.base_port) as pool:
+        while es.generation < args.generations:
+            start = time.perf_counter()
+            samples = es.ask()
+            population = [to_gains(space, x) for x in samples]
+            rows = evaluate_closed_loop(pool, args.controller, population, args.backend, args.ticks,
+                                        args.target_yaw_rate, args.level, args.home)
+            for row in rows:
+                row["score"] = score(row, args.stability_weight)
+            # a kockán kívüli mintákat a távolsággal büntetjük, így a keresés visszatér
+            penalties = np.sum((samples - np.clip(samples, 0, 1)) ** 2, axis=1)
+            es.tell(samples, np.array([row["score"] for row in rows]) + penalties)
+
+            best = min(rows, key=lambda row: row["score"])
+            if checkpoint["best"] is None or best["score"] < checkpoint["best"]["score"]:
+                checkpoint["best"] = best
+            checkpoint["history"].append({"generation": es.generation, "best": best["score"],
+                                          "mean": float(np.mean([row["score"] for row in rows])),
+                                          "sigma": es.sigma})
+            checkpoint["es"] = es.state()
+            save_checkpoint(args.checkpoint, checkpoint)
+            print(f"generation {es.generation}: best {best['score']:.3f}, "
+                  f"mean {checkpoint['history'][-1]['mean']:.3f}, sigma {es.sigma:.3f} "
+                  f"({time.perf_counter() - start:.1f} s)")
+
+    best = checkpoint["best"]
+    print("Best gains: " + ", ".join(f"{name}={best[name]:.3f}" for name in space))
+    print(f"rmse {best['rmse']:.3f}, stability {best['stability']:.3f}, score {best['score']:.3f}")
+
+if __name__ == "__main__":
+    main()
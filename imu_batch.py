@@ -0,0 +1,37 @@
+import numpy as np
+
+# az AdvancedIMU mintáinak 3 elemű mezői, ebben a sorrendben kerülnek a tömb oszlopaiba
+VECTOR_FIELDS = ("accSmooth", "accRaw", "angVel", "angVelSmooth", "angAccel", "pos", "dirX", "dirY", "dirZ")
+
+
+# Egy imu.poll() összes mintája egyszerre NumPy-ba töltve. Az AdvancedIMU
+# (gfx_update_time=0.01) 100 Hz-en mér, és a poll() az előző poll óta gyűlt összes mintát
+# visszaadja, sorszám kulccsal (0.0 a legrégebbi) - a scriptek eddig csak a [0.0]-t,
+# vagyis a legrégebbit olvasták. Itt minden minta egyetlen (n, 28) méretű, folytonos
+# float tömbbe kerül idő szerint rendezve, a mezők ennek nézetei (time: (n,), a többi (n, 3)).
+# since: az ennél nem újabb mintákat eldobjuk (pl. ha ugyanazt a poll-t kétszer kapjuk meg).
+class ImuBatch:
+    def __init__(self, readings, since=None):
+        samples = sorted(readings.values(), key=lambda sample: sample["time"])
+        # a legfrissebb minta akkor is megvan, ha nincs új, a régi scriptek ezt kapják
+        self.newest = samples[-1] if samples else None
+        if since is not None:
+            samples = [sample for sample in samples if sample["time"] > since]
+        self.data = np.array([[sample["time"], *(value for name in VECTOR_FIELDS for value in sample[name])]
+                              for sample in samples], dtype=float).reshape(len(samples), 1 + 3 * len(VECTOR_FIELDS))
+        self.time = self.data[:, 0]
+        for i, name in enumerate(VECTOR_FIELDS):
+            setattr(self, name, self.data[:, 1 + 3 * i:4 + 3 * i])
+
+    def __len__(self):
+        return len(self.data)
+
+    # a legfrissebb minta dict-ként, ugyanúgy, ahogy az imu.poll()[kulcs] adná
+    def latest(self):
+        return self.newest
+
+    # mintánkénti dt-k: az első az előző batch utolsó mintájától (prev_time) számít
+    def dts(self, prev_time=None):
+        if prev_time is None:
+            prev_time = self.time[0] if len(self) else 0.0
+        return np.diff(self.time, prepend=prev_time)
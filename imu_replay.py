@@ -0,0 +1,167 @@
+import ast
+import math
+import sys
+import time
+
+
+class ReplayFinished(Exception):
+    pass
+
+
+# A tmp_*.json fájlok egy AdvancedIMU.poll() eredményét tartalmazzák, float kulcsokkal
+# (0.0, 1.0, ...). Ez nem érvényes JSON, de érvényes Python literál, így
+# ast.literal_eval-lal beolvasható. Kulcs szerint rendezett mintalistát ad vissza.
+def load_imu_dump(path):
+    with open(path) as f:
+        dump = ast.literal_eval(f.read())
+    return [dump[key] for key in sorted(dump)]
+
+
+# Visszajátszás: egy felvett IMU mintasort ugyanazon a felületen ad vissza, amit a
+# scriptek használnak (imu.poll(), vehicle.sensors.poll(), vehicle.sensors["electrics"],
+# vehicle.control(...)), így BeamNG nélkül is futtatható a get_data / control_loop.
+# Nincs benne várakozás, tehát annyira gyors, amennyire a vezérlő kód.
+class ReplaySession:
+    def __init__(self, samples, water_temperature=90.0):
+        self.samples = samples
+        self.water_temperature = water_temperature
+        self.index = -1
+        self.seen = {}
+        self.imu = ReplayIMU(self)
+        self.vehicle = ReplayVehicle(self)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(load_imu_dump(path), **kwargs)
+
+    # Egy tickben a vehicle.sensors.poll() és az imu.poll() ugyanazt a mintát kapja:
+    # csak akkor lépünk a következőre, ha az adott forrás már látta az aktuálisat.
+    def sample_for(self, source):
+        if self.seen.get(source, -1) >= self.index:
+            self.index += 1
+        if self.index >= len(self.samples):
+            raise ReplayFinished(f"replay finished after {len(self.samples)} samples")
+        self.seen[source] = self.index
+        return self.samples[self.index]
+
+    # Electrics szenzor nincs a felvételben, ezért a pozícióváltozásból becsüljük
+    # a sebességet; a vízhőmérséklet állandó.
+    def electrics_for(self, index):
+        speed = 0.0
+        if index > 0:
+            previous = self.samples[index - 1]
+            current = self.samples[index]
+            dt = current["time"] - previous["time"]
+            if dt > 0:
+                speed = math.dist(current["pos"], previous["pos"]) / dt
+        return {
+            "virtualAirspeed": speed,
+            "wheelspeed": speed,
+            "water_temperature": self.water_temperature,
+        }
+
+
+class ReplayIMU:
+    def __init__(self, session):
+        self.session = session
+
+    def poll(self):
+        return {0.0: self.session.sample_for("imu")}
+
+
+class ReplaySensors:
+    def __init__(self, session):
+        self.session = session
+        self.data = {}
+
+    def attach(self, name, sensor):
+        pass
+
+    def poll(self):
+        self.session.sample_for("electrics")
+        self.data["electrics"] = self.session.electrics_for(self.session.index)
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+
+class ReplayVehicle:
+    def __init__(self, session):
+        self.session = session
+        self.sensors = ReplaySensors(session)
+        self.commands = []  # minden kiadott vehicle.control(...) parancs
+
+    def control(self, **kwargs):
+        self.commands.append(kwargs)
+
+    def set_shift_mode(self, mode):
+        pass
+
+
+# A fifth_test.py get_data + control_loop ciklusa és a change_direction_calculate
+# egy felvételen, tickenként egy sorral (yaw_rate, irány, kiadott parancs).
+def replay_fifth_test(path):
+    import fifth_test
+    from cooling_state import CoolingStateMachine
+    from rolling_normalizer import RollingNormalizer
+    from state_estimator import StateEstimator
+
+    session = ReplaySession.from_file(path)
+    yaw_rates = RollingNormalizer(20)
+    velocities = RollingNormalizer(20)
+    data_dict = {}
+    cooling_state = CoolingStateMachine()
+    estimator = StateEstimator()
+    rows = []
+    try:
+        while True:
+            fifth_test.get_data(session.vehicle, session.imu, data_dict, yaw_rates, velocities, estimator)
+            fifth_test.control_loop(session.vehicle, data_dict, yaw_rates, velocities, cooling_state)
+            command = session.vehicle.commands[-1]
+            rows.append((
+                data_dict["yaw_rate"],
+                data_dict["turn_direction"],
+                fifth_test.change_direction_calculate(data_dict["yaw_rate"]),
+                command["steering"],
+                command["throttle"],
+                data_dict["sideslip"],
+            ))
+    except ReplayFinished:
+        pass
+    fifth_test.log.flush()
+    return rows
+
+
+# A second_test.py előre/hátra irányfelismerője ugyanazon a felvételen.
+def replay_second_test(path):
+    from direction_classifier import DirectionClassifier
+
+    session = ReplaySession.from_file(path)
+    classifier = DirectionClassifier(window=10)
+    directions = []
+    try:
+        while True:
+            data = session.imu.poll()[0.0]
+            directions.append(classifier.update(data["accSmooth"][0]))
+    except ReplayFinished:
+        pass
+    return directions
+
+
+def main():
+    paths = sys.argv[1:] or ["tmp_forward_only.json", "tmp_left_circle.json", "tmp_right_circle.json"]
+    import fifth_test  # az importálás ideje ne számítson bele a mérésbe
+    for path in paths:
+        start = time.perf_counter()
+        rows = replay_fifth_test(path)
+        directions = replay_second_test(path)
+        elapsed = time.perf_counter() - start
+
+        print(f"=== {path}: {len(rows)} samples in {elapsed * 1000:.2f} ms ===")
+        for (yaw_rate, turn, change, steering, throttle, sideslip), direction in zip(rows, directions):
+            print(f"yaw_rate: {yaw_rate:.3f}, turn: {turn}, change: {change}, "
+                  f"direction: {direction}, steering: {steering:.3f}, throttle: {throttle:.3f}, "
+                  f"sideslip: {math.degrees(sideslip):.1f} deg")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import math
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# a gyűrűbe írt data_dict mezők, ebben a sorrendben (hiányzó mező: NaN)
+FIELDS = ("time", "yaw_rate", "desired_yaw_rate", "steering", "throttle", "water_temp", "pos_x", "pos_y")
+HEADER_BYTES = 64  # az írt sorok száma (int64), külön cache line-on
+
+
+# Osztott memóriás gyűrűpuffer a vezérlő process és a dashboard között. Az író tickenként
+# egy sort másol be (nincs zár, nincs várakozás), utána növeli a számlálót. Az olvasó a
+# számlálóból tudja, mi új; ha lemaradt és az író közben felülírta a sorokat, azokat eldobja.
+# Egy lassú vagy bezárt olvasó így soha nem lassítja a vezérlést.
+class TelemetryRing:
+    def __init__(self, shm, capacity, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self.counter = np.ndarray((1,), dtype=np.int64, buffer=shm.buf)
+        self.rows = np.ndarray((capacity, len(FIELDS)), dtype=np.float64, buffer=shm.buf, offset=HEADER_BYTES)
+        self.row = np.empty(len(FIELDS))
+        self.read_count = 0
+        self.dropped = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def create(cls, capacity=4096):
+        size = HEADER_BYTES + capacity * len(FIELDS) * 8
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), capacity, owner=True)
+        ring.counter[0] = 0
+        return ring
+
+    # A csatlakozó process nem regisztrálhatja a szegmenst a resource_trackerben, mert az
+    # kilépéskor törölné az író alól (Python 3.13-tól erre való a track=False)
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        capacity = (shm.size - HEADER_BYTES) // (len(FIELDS) * 8)
+        return cls(shm, capacity, owner=False)
+
+    def write(self, data_dict):
+        row = self.row
+        for i, name in enumerate(FIELDS):
+            row[i] = data_dict.get(name, math.nan)
+        count = int(self.counter[0])
+        self.rows[count % self.capacity] = row
+        self.counter[0] = count + 1
+
+    # az utolsó olvasás óta írt sorok másolata (n, len(FIELDS)) tömbben
+    def read(self):
+        end = int(self.counter[0])
+        start = max(self.read_count, end - self.capacity)
+        indices = np.arange(start, end) % self.capacity
+        rows = self.rows[indices]
+        # másolás közben az író felülírhatta a legrégebbi sorokat (a count - capacity indexűt
+        # a számláló növelése előtt írja): azokat eldobjuk
+        overwritten = int(self.counter[0]) - self.capacity + 1 - start
+        if overwritten > 0:
+            rows = rows[overwritten:]
+            start += overwritten
+        self.dropped += start - self.read_count
+        self.read_count = end
+        return rows
+
+    def close(self):
+        del self.counter, self.rows
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Ritkított pont-tároló az XY pályához: ha megtelik, minden második pontot eldobjuk, és
+# onnantól feleannyi pontot veszünk fel, így a teljes pálya mindig max_points ponttal látszik.
+class DecimatedTrack:
+    def __init__(self, max_points=2000):
+        self.max_points = max_points
+        self.points = np.empty((0, 2))
+        self.stride = 1
+        self.seen = 0
+
+    def extend(self, xy):
+        count = len(xy)
+        xy = xy[(np.arange(count) + self.seen) % self.stride == 0]
+        self.seen += count
+        self.points = np.concatenate([self.points, xy])
+        while len(self.points) > self.max_points:
+            self.points = self.points[::2]
+            self.stride *= 2
+
+
+# A dashboard process fő ciklusa: interval másodpercenként kiolvassa az új sorokat és újrarajzol.
+# Az idősoros ábrák az utolsó history_seconds másodpercet mutatják, legfeljebb max_points ponttal.
+def run_dashboard(name, interval=0.1, history_seconds=30.0, max_points=1000, max_frames=None):
+    import matplotlib.pyplot as plt
+
+    ring = TelemetryRing.attach(name)
+    columns = {field: i for i, field in enumerate(FIELDS)}
+    history = np.empty((0, len(FIELDS)))
+    track = DecimatedTrack()
+
+    fig, ((ax_yaw, ax_control), (ax_temp, ax_track)) = plt.subplots(2, 2, figsize=(11, 7))
+    lines = {
+        "yaw_rate": ax_yaw.plot([], [], label="yaw_rate")[0],
+        "desired_yaw_rate": ax_yaw.plot([], [], "--", label="desired")[0],
+        "steering": ax_control.plot([], [], label="steering")[0],
+        "throttle": ax_control.plot([], [], label="throttle")[0],
+        "water_temp": ax_temp.plot([], [], color="tab:red", label="water_temp")[0],
+    }
+    track_line = ax_track.plot([], [], lw=0.8)[0]
+    ax_yaw.set_ylabel("rad/s")
+    ax_temp.set_ylabel("°C")
+    ax_track.set_aspect("equal", adjustable="datalim")
+    ax_track.set_title("track")
+    for ax in (ax_yaw, ax_control, ax_temp):
+        ax.legend(loc="upper left")
+        ax.set_xlabel("time [s]")
+    if hasattr(fig.canvas.manager, "set_window_title"):
+        fig.canvas.manager.set_window_title("drifter dashboard")
+    plt.show(block=False)
+
+    frames = 0
+    try:
+        while plt.fignum_exists(fig.number) and (max_frames is None or frames < max_frames):
+            rows = ring.read()
+            if len(rows):
+                history = np.concatenate([history, rows])
+                history = history[history[:, 0] >= history[-1, 0] - history_seconds]
+                xy = rows[:, [columns["pos_x"], columns["pos_y"]]]
+                track.extend(xy[~np.isnan(xy).any(axis=1)])
+
+                shown = history[::max(1, len(history) // max_points)]
+                for field, line in lines.items():
+                    line.set_data(shown[:, 0], shown[:, columns[field]])
+                track_line.set_data(track.points[:, 0], track.points[:, 1])
+                for ax in (ax_yaw, ax_control, ax_temp, ax_track):
+                    ax.relim()
+                    ax.autoscale_view()
+                fig.canvas.draw_idle()
+            plt.pause(interval)
+            frames += 1
+    finally:
+        ring.close()
+        plt.close(fig)
+    return frames
+
+
+# Külön processzként indítva: a vezérlő nem vár rá, és ha a processz meghal, az írást nem zavarja
+def start_dashboard(ring, **kwargs):
+    import multiprocessing
+
+    process = multiprocessing.Process(target=run_dashboard, args=(ring.name,), kwargs=kwargs, daemon=True)
+    process.start()
+    return process
+
+
+# Egy futó vezérlő gyűrűjére csatlakozik: python live_dashboard.py <név>
+# (a fifth_test.py --dashboard kiírja a nevet)
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("usage: live_dashboard.py <shared memory name>")
+    run_dashboard(sys.argv[1])
+
+if __name__ == "__main__":
+    main()
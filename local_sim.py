@@ -0,0 +1,298 @@
+import math
+
+import numpy as np
+
+# Helyi drift szimulátor a BeamNG helyett, tisztán numpy-ban. Egyszerre sok (akár több ezer)
+# független autót léptet egyetlen tömbművelettel: dinamikus bicikli modell nemlineáris
+# gumimodellel (egyszerűsített Pacejka), választható hajtással (DRIVETRAINS), automata
+# váltóval és motorhőmérséklettel. Autónként ugyanazt a felületet adja, amit a scriptek használnak:
+# vehicle.control(...), vehicle.sensors.poll(), vehicle.sensors["electrics"], imu.poll().
+
+GRAVITY = 9.81
+MASS = 1500.0
+YAW_INERTIA = 2500.0
+FRONT_AXLE = 1.3  # tömegközéppont - első tengely [m]
+REAR_AXLE = 1.5
+WHEEL_RADIUS = 0.33
+MAX_STEERING_ANGLE = 0.6  # steering = 1 -> 0.6 rad kerékszög jobbra (mint a BeamNG-ben: negatív yaw_rate)
+TIRE_B = 10.0  # Pacejka merevség
+REAR_GRIP = 1.15  # szélesebb hátsó gumi: gáz nélkül az autó a határon is alulkormányzott
+TIRE_C = 1.3  # Pacejka alak
+DRAG = 0.4  # légellenállás [N/(m/s)^2]
+ROLLING = 150.0  # gördülési ellenállás [N]
+BRAKE_DECEL = 0.9  # teljes fék: ennyi g
+
+GEAR_RATIOS = np.array([3.5, 2.2, 1.5, 1.1, 0.9, 0.75])
+FINAL_DRIVE = 3.5
+MAX_TORQUE = 450.0  # Nm, 4.4 V8 körül
+PEAK_RPM = 4500.0
+IDLE_RPM = 800.0
+REDLINE_RPM = 7000.0
+UPSHIFT_RPM = (2500.0, 6500.0)  # váltási fordulat gáz nélkül / teljes gáznál
+DOWNSHIFT_RPM = (1200.0, 2400.0)
+KINEMATIC_SPEED = (1.5, 3.0)  # ez alatt kinematikus, e fölött dinamikus modell, köztük átmenet
+
+# a hajtóerő első tengelyre jutó aránya
+DRIVETRAINS = {"RWD": 0.0, "AWD": 0.4, "FWD": 1.0}
+
+AMBIENT_TEMPERATURE = 85.0
+HEATING = 2.0  # °C/s teljes teljesítménynél
+COOLING = 0.02  # 1/s, álló helyzetben
+AIRFLOW_COOLING = 0.05  # sebességgel arányos többlethűtés
+
+
+class LocalSim:
+    # drivetrain: a DRIVETRAINS egyik neve, vagy autónként egy-egy (n hosszú lista)
+    def __init__(self, n=1, physics_rate=60, substeps=4, mu=1.0, water_temperature=88.0, drivetrain="RWD"):
+        self.n = n
+        self.physics_rate = physics_rate
+        self.dt = 1.0 / physics_rate
+        self.substeps = substeps
+        self.mu = np.broadcast_to(np.asarray(mu, dtype=float), (n,)).copy()
+        names = [drivetrain] * n if isinstance(drivetrain, str) else list(drivetrain)
+        self.front_share = np.array([DRIVETRAINS[name] for name in names])
+        self.time = 0.0
+
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.heading = np.zeros(n)
+        self.vx = np.zeros(n)  # hosszirányú sebesség (karosszéria)
+        self.vy = np.zeros(n)  # keresztirányú sebesség
+        self.yaw_rate = np.zeros(n)
+        self.yaw_accel = np.zeros(n)
+        self.ax = np.zeros(n)
+        self.ay = np.zeros(n)
+        self.wheelspeed = np.zeros(n)
+        self.rpm = np.full(n, IDLE_RPM)
+        self.gear = np.zeros(n, dtype=int)  # index a GEAR_RATIOS-ban
+        self.water_temperature = np.full(n, float(water_temperature))
+
+        self.steering = np.zeros(n)
+        self.throttle = np.zeros(n)
+        self.brake = np.zeros(n)
+        self.parkingbrake = np.zeros(n)
+
+        self.vehicles = [LocalVehicle(self, i) for i in range(n)]
+        self.imus = [LocalIMU(self, i) for i in range(n)]
+        self.imu_buffers = {}  # buffer_imu-val bekapcsolt autók: index -> a poll óta gyűlt minták
+        self.vehicle = self.vehicles[0]
+        self.imu = self.imus[0]
+
+    @property
+    def speed(self):
+        return np.hypot(self.vx, self.vy)
+
+    @property
+    def sideslip(self):
+        return np.arctan2(self.vy, np.maximum(np.abs(self.vx), 0.5))
+
+    # kötegelt vezérlés: skalár vagy n hosszú tömb, a meg nem adott bemenet nem változik
+    def control(self, steering=None, throttle=None, brake=None, parkingbrake=None):
+        if steering is not None:
+            self.steering[:] = np.clip(steering, -1, 1)
+        if throttle is not None:
+            self.throttle[:] = np.clip(throttle, 0, 1)
+        if brake is not None:
+            self.brake[:] = np.clip(brake, 0, 1)
+        if parkingbrake is not None:
+            self.parkingbrake[:] = np.clip(parkingbrake, 0, 1)
+
+    def step(self, count=1):
+        h = self.dt / self.substeps
+        for _ in range(count):
+            for _ in range(self.substeps):
+                self.substep(h)
+            self.time += self.dt
+            for i, buffer in self.imu_buffers.items():
+                buffer.append(self.imu_sample(i))
+
+    # mint az AdvancedIMU: fizikai lépésenként mintát gyűjt, a poll az összeset visszaadja
+    def buffer_imu(self, i=0):
+        self.imu_buffers[i] = []
+
+    def sleep(self, seconds):
+        self.step(max(1, round(seconds * self.physics_rate)))
+
+    def substep(self, h):
+        mu = self.mu
+        delta = -self.steering * MAX_STEERING_ANGLE  # delta > 0: balra
+        vx, vy, r = self.vx, self.vy, self.yaw_rate
+        speed = np.hypot(vx, vy)
+        forward = np.clip(vx, -1.0, 1.0)  # a menetirány előjele, 0 körül simítva
+        vx_safe = np.maximum(np.abs(vx), KINEMATIC_SPEED[0])
+        # kis sebességnél a csúszási szög nem értelmezhető: ott kinematikus modellre váltunk
+        low, high = KINEMATIC_SPEED
+        dynamic = np.clip((speed - low) / (high - low), 0.0, 1.0)
+
+        front_load = MASS * GRAVITY * REAR_AXLE / (FRONT_AXLE + REAR_AXLE)
+        rear_load = MASS * GRAVITY * FRONT_AXLE / (FRONT_AXLE + REAR_AXLE)
+
+        # hajtás: motor nyomaték a fordulatszámból, automata váltó
+        ratio = GEAR_RATIOS[self.gear] * FINAL_DRIVE
+        self.rpm = np.clip(self.wheelspeed / WHEEL_RADIUS * ratio * 60 / (2 * math.pi), IDLE_RPM, REDLINE_RPM)
+        torque_curve = np.clip(1 - ((self.rpm - PEAK_RPM) / 5000) ** 2, 0.3, 1.0)
+        torque_curve = np.where(self.rpm >= REDLINE_RPM, 0.0, torque_curve)
+        drive_demand = self.throttle * MAX_TORQUE * torque_curve * ratio / WHEEL_RADIUS
+        upshift_rpm = UPSHIFT_RPM[0] + (UPSHIFT_RPM[1] - UPSHIFT_RPM[0]) * self.throttle
+        downshift_rpm = DOWNSHIFT_RPM[0] + (DOWNSHIFT_RPM[1] - DOWNSHIFT_RPM[0]) * self.throttle
+        upshift = (self.rpm > upshift_rpm) & (self.gear < len(GEAR_RATIOS) - 1)
+        downshift = (self.rpm < downshift_rpm) & (self.gear > 0)
+        self.gear += upshift.astype(int) - downshift.astype(int)
+
+        # hajtott gumi: ha a hajtóerő több, mint amit a tapadás elbír, kipörög, és
+        # oldalirányban is csak a súrlódási kör maradékát tudja átvinni.
+        # A kézifék blokkolja a hátsó kereket: fékez, és elviszi az oldaltapadást.
+        # Az első hajtóerő a kerék irányában hat, tehát kormányzáskor oldalirányban is.
+        front_demand = drive_demand * self.front_share
+        rear_demand = drive_demand - front_demand
+        front_capacity = mu * front_load
+        rear_capacity = mu * REAR_GRIP * rear_load
+        front_drive = np.minimum(front_demand, 0.9 * front_capacity)
+        rear_drive = np.minimum(rear_demand, 0.9 * rear_capacity) * (1 - self.parkingbrake)
+        spin = np.maximum(np.maximum(rear_demand - rear_drive, 0.0) / rear_capacity * (1 - self.parkingbrake),
+                          np.maximum(front_demand - front_drive, 0.0) / front_capacity)
+        front_lateral_capacity = np.sqrt(np.maximum(front_capacity ** 2 - front_drive ** 2, 0.0))
+        rear_lateral_capacity = (np.sqrt(np.maximum(rear_capacity ** 2 - rear_drive ** 2, 0.0))
+                                 * (1 - 0.7 * self.parkingbrake))
+
+        alpha_front = delta - np.arctan2(vy + FRONT_AXLE * r, vx_safe)
+        alpha_rear = -np.arctan2(vy - REAR_AXLE * r, vx_safe)
+        front_force = front_lateral_capacity * np.sin(TIRE_C * np.arctan(TIRE_B * alpha_front))
+        rear_force = rear_lateral_capacity * np.sin(TIRE_C * np.arctan(TIRE_B * alpha_rear))
+
+        brake_force = (self.brake * BRAKE_DECEL * MASS * GRAVITY
+                       + self.parkingbrake * 0.7 * rear_capacity) * forward
+        resistance = DRAG * vx * np.abs(vx) + ROLLING * forward
+
+        cos_delta, sin_delta = np.cos(delta), np.sin(delta)
+        longitudinal = (rear_drive + front_drive * cos_delta - brake_force - resistance) / MASS
+        ax = longitudinal - front_force * sin_delta / MASS
+        front_lateral = front_force * cos_delta + front_drive * sin_delta
+        ay = (front_lateral + rear_force) / MASS
+        yaw_accel = (FRONT_AXLE * front_lateral - REAR_AXLE * rear_force) / YAW_INERTIA
+
+        # kinematikus bicikli modell: a kerekek csúszás nélkül gördülnek
+        vx_next = vx + (dynamic * (ax + vy * r) + (1 - dynamic) * longitudinal) * h
+        kinematic_yaw_rate = vx_next * np.tan(delta) / (FRONT_AXLE + REAR_AXLE)
+        r_next = dynamic * (r + yaw_accel * h) + (1 - dynamic) * kinematic_yaw_rate
+        vy_next = dynamic * (vy + (ay - vx * r) * h) + (1 - dynamic) * kinematic_yaw_rate * REAR_AXLE
+
+        self.yaw_accel = (r_next - r) / h
+        self.ax = (vx_next - vx) / h - vy * r
+        self.ay = (vy_next - vy) / h + vx * r
+        self.vx, self.vy, self.yaw_rate = vx_next, vy_next, r_next
+
+        self.heading += self.yaw_rate * h
+        c, s = np.cos(self.heading), np.sin(self.heading)
+        self.x += (self.vx * c - self.vy * s) * h
+        self.y += (self.vx * s + self.vy * c) * h
+
+        # kipörgésnél a kerék gyorsabban forog, mint ahogy az autó halad
+        self.wheelspeed = np.abs(self.vx) + spin * 5.0
+
+        power = self.throttle * torque_curve * self.rpm / REDLINE_RPM
+        cooling = COOLING * (self.water_temperature - AMBIENT_TEMPERATURE) * (1 + AIRFLOW_COOLING * speed)
+        self.water_temperature += (HEATING * power - cooling) * h
+
+    # a BeamNG felvételei szerint: dirX előre, dirY fel, dirZ jobbra; az accSmooth ugyanebben a
+    # keretben (gravitáció nélkül), az angVel / angAccel világkeretben (z fel, balra pozitív)
+    def imu_sample(self, i):
+        c, s = math.cos(self.heading[i]), math.sin(self.heading[i])
+        return {
+            "dirX": [c, s, 0.0],
+            "dirY": [0.0, 0.0, 1.0],
+            "dirZ": [s, -c, 0.0],
+            "accSmooth": [float(self.ax[i]), 0.0, -float(self.ay[i])],
+            "accRaw": [float(self.ax[i]), 0.0, -float(self.ay[i])],
+            "angVel": [0.0, 0.0, float(self.yaw_rate[i])],
+            "angVelSmooth": [0.0, 0.0, float(self.yaw_rate[i])],
+            "angAccel": [0.0, 0.0, float(self.yaw_accel[i])],
+            "pos": [float(self.x[i]), float(self.y[i]), 0.0],
+            "time": self.time,
+        }
+
+    def electrics(self, i):
+        return {
+            "virtualAirspeed": float(self.speed[i]),
+            "wheelspeed": float(self.wheelspeed[i]),
+            "water_temperature": float(self.water_temperature[i]),
+            "rpm": float(self.rpm[i]),
+            "gear": int(self.gear[i]) + 1,
+        }
+
+
+class LocalIMU:
+    def __init__(self, sim, index=0):
+        self.sim = sim
+        self.index = index
+
+    def poll(self):
+        buffer = self.sim.imu_buffers.get(self.index)
+        if not buffer:
+            return {0.0: self.sim.imu_sample(self.index)}
+        self.sim.imu_buffers[self.index] = []
+        return {float(k): sample for k, sample in enumerate(buffer)}
+
+
+class LocalSensors:
+    def __init__(self, sim, index=0):
+        self.sim = sim
+        self.index = index
+        self.data = {}
+
+    def attach(self, name, sensor):
+        pass
+
+    def poll(self):
+        self.data["electrics"] = self.sim.electrics(self.index)
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+
+class LocalVehicle:
+    def __init__(self, sim, index=0):
+        self.sim = sim
+        self.index = index
+        self.sensors = LocalSensors(sim, index)
+
+    # mint a BeamNG-ben: csak a megadott bemenetek változnak (a váltó automata)
+    def control(self, steering=None, throttle=None, brake=None, parkingbrake=None, **kwargs):
+        i = self.index
+        if steering is not None:
+            self.sim.steering[i] = min(1.0, max(-1.0, steering))
+        if throttle is not None:
+            self.sim.throttle[i] = min(1.0, max(0.0, throttle))
+        if brake is not None:
+            self.sim.brake[i] = min(1.0, max(0.0, brake))
+        if parkingbrake is not None:
+            self.sim.parkingbrake[i] = min(1.0, max(0.0, parkingbrake))
+
+    def set_shift_mode(self, mode):
+        pass
+
+    def set_part_config(self, config):
+        pass
+
+
+# Sebességmérés: n autó, konstans kormány/gáz mellett 10 s szimulált idő
+def main():
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    sim = LocalSim(n)
+    sim.control(steering=np.linspace(-1, 1, n), throttle=1.0)
+    steps = 600
+    start = time.perf_counter()
+    sim.step(steps)
+    elapsed = time.perf_counter() - start
+    simulated = steps * sim.dt
+    print(f"{n} cars x {simulated:.0f} s simulated in {elapsed:.2f} s "
+          f"({n * simulated / elapsed:.0f}x real time in total)")
+    print(f"yaw_rate range {sim.yaw_rate.min():.2f} .. {sim.yaw_rate.max():.2f} rad/s, "
+          f"max sideslip {np.degrees(np.abs(sim.sideslip).max()):.1f} deg, "
+          f"water temperature up to {sim.water_temperature.max():.1f} C")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import time
+
+import numpy as np
+
+from tick_profiler import LatencyHistogram
+
+# Járműparaméterek (etk800 körüli becslés, a local_sim értékeivel egyezően)
+GRAVITY = 9.81
+MASS = 1500.0
+YAW_INERTIA = 2500.0
+FRONT_AXLE = 1.3  # lf, tömegközéppont - első tengely [m]
+REAR_AXLE = 1.5  # lr
+MAX_STEERING_ANGLE = 0.6  # steering = 1 -> 0.6 rad kerékszög jobbra (negatív yaw_rate, mint a BeamNG-ben)
+TIRE_B = 10.0  # Pacejka merevség
+TIRE_C = 1.3  # Pacejka alak
+REAR_GRIP = 1.15  # a hátsó gumi tapadása az elsőhöz képest
+DRIVE_FORCE = 15000.0  # hajtóerő teljes gáznál alsó fokozatban [N]
+DRAG = 0.4  # légellenállás [N/(m/s)^2]
+ROLLING = 150.0  # gördülési ellenállás [N]
+MIN_SPEED = 2.0  # e alatt a csúszási szögek nem értelmezhetők, a modell ennyivel számol
+
+
+# Drift modell: dinamikus bicikli modell telítődő (Pacejka) gumikkal. A hátsó hajtóerő a
+# tapadási körből elveszi az oldalirányú tapadást, így a gáz a hátsó kerekek kicsúszásával
+# és a sebességen át is hat a yaw_rate-re. Állapot: [sideslip (béta), yaw_rate, sebesség],
+# bemenet: [steering, throttle].
+def drift_model(x, u):
+    beta, yaw_rate, speed = x
+    steering, throttle = u
+    speed = max(speed, MIN_SPEED)
+    delta = -steering * MAX_STEERING_ANGLE
+    front_capacity = MASS * GRAVITY * REAR_AXLE / (FRONT_AXLE + REAR_AXLE)
+    rear_capacity = REAR_GRIP * MASS * GRAVITY * FRONT_AXLE / (FRONT_AXLE + REAR_AXLE)
+    rear_drive = 0.9 * rear_capacity * np.tanh(throttle * DRIVE_FORCE / (0.9 * rear_capacity))
+    rear_lateral_capacity = np.sqrt(max(rear_capacity ** 2 - rear_drive ** 2, 0.0))
+    vx, vy = speed * np.cos(beta), speed * np.sin(beta)
+    alpha_front = delta - np.arctan2(vy + FRONT_AXLE * yaw_rate, vx)
+    alpha_rear = -np.arctan2(vy - REAR_AXLE * yaw_rate, vx)
+    front_force = front_capacity * np.sin(TIRE_C * np.arctan(TIRE_B * alpha_front))
+    rear_force = rear_lateral_capacity * np.sin(TIRE_C * np.arctan(TIRE_B * alpha_rear))
+    vx_dot = (rear_drive - front_force * np.sin(delta) - DRAG * vx * abs(vx) - ROLLING) / MASS + vy * yaw_rate
+    vy_dot = (front_force * np.cos(delta) + rear_force) / MASS - vx * yaw_rate
+    yaw_accel = (FRONT_AXLE * front_force * np.cos(delta) - REAR_AXLE * rear_force) / YAW_INERTIA
+    return np.array([(vx * vy_dot - vy * vx_dot) / speed ** 2, yaw_accel, (vx * vx_dot + vy * vy_dot) / speed])
+
+
+# Diszkrét lineáris modell egy munkapont körül: x+ = A x + B u + c
+def linearize(x0, u0, dt, eps=1e-4):
+    f0 = drift_model(x0, u0)
+    nx, nu = len(x0), len(u0)
+    Ac = np.empty((nx, nx))
+    Bc = np.empty((nx, nu))
+    for i in range(nx):
+        dx = np.zeros(nx)
+        dx[i] = eps
+        Ac[:, i] = (drift_model(x0 + dx, u0) - f0) / eps
+    for i in range(nu):
+        du = np.zeros(nu)
+        du[i] = eps
+        Bc[:, i] = (drift_model(x0, u0 + du) - f0) / eps
+    cc = f0 - Ac @ x0 - Bc @ u0
+    # másodrendű közelítés az exp(Ac dt)-re
+    Ad = Ac * dt
+    A = np.eye(nx) + Ad + Ad @ Ad / 2
+    B = (np.eye(nx) * dt + Ad * dt / 2) @ Bc
+    c = (np.eye(nx) * dt + Ad * dt / 2) @ cc
+    return A, B, c
+
+
+# Drift egyensúly (trim): adott yaw_rate-hez és kormányálláshoz az a sideslip, sebesség és gáz,
+# amelynél a drift_model minden deriváltja 0. Newton-iteráció numerikus Jacobival, balra
+# (pozitív yaw_rate) számolva, jobbra tükrözve. ValueError, ha ilyen drift nincs (a kért
+# yaw_rate az autónak túl nagy).
+def drift_trim(yaw_rate, steering, iterations=100, tolerance=1e-9):
+    direction = 1 if yaw_rate >= 0 else -1
+    yaw_rate, steering = abs(yaw_rate), -abs(steering)
+
+    def residual(z):
+        return drift_model(np.array([z[0], yaw_rate, z[1]]), np.array([steering, z[2]]))
+
+    for guess in ((-0.2, 3.5, 0.6), (-0.1, 6.0, 0.4), (-0.4, 3.0, 0.8)):
+        z = np.array(guess)
+        for iteration in range(iterations):
+            f = residual(z)
+            if np.max(np.abs(f)) < tolerance:
+                break
+            J = np.empty((3, 3))
+            for i in range(3):
+                dz = np.zeros(3)
+                dz[i] = 1e-6
+                J[:, i] = (residual(z + dz) - f) / 1e-6
+            step = np.linalg.lstsq(J, f, rcond=None)[0]
+            z = z - (0.5 if iteration < 10 else 1.0) * step  # az elején csillapítva
+        else:
+            continue
+        beta, speed, throttle = z
+        if 0 <= throttle <= 1 and speed > MIN_SPEED:
+            return direction * beta, speed, direction * steering, throttle
+    raise ValueError(f"no drift equilibrium at yaw_rate {direction * yaw_rate} with steering {steering}")
+
+
+# Egy munkaponthoz tartozó, előre kiszámolt (kondenzált) predikciós mátrixok és QP
+class Prediction:
+    def __init__(self, A, B, c, horizon, yaw_weight, input_weights, rate_weights):
+        nx, nu = B.shape
+        N = horizon
+        Phi = np.zeros((N, nx))  # yaw_rate predikció: r = Phi x0 + Gamma U + C
+        Gamma = np.zeros((N, N * nu))
+        C = np.zeros(N)
+        Ak = np.eye(nx)
+        offset = np.zeros(nx)
+        powers = [np.eye(nx)]
+        for k in range(N):
+            Ak = A @ Ak
+            offset = A @ offset + c
+            powers.append(Ak)
+            Phi[k] = Ak[1]
+            C[k] = offset[1]
+        for k in range(N):
+            for j in range(k + 1):
+                Gamma[k, j * nu:(j + 1) * nu] = (powers[k - j] @ B)[1]
+
+        # Bemenetváltozás: D U - E u_prev
+        D = np.eye(N * nu) - np.eye(N * nu, k=-nu)
+        R = np.diag(np.tile(input_weights, N))
+        Rd = np.diag(np.tile(rate_weights, N))
+
+        self.Phi = Phi
+        self.Gamma = Gamma
+        self.C = C
+        self.G = yaw_weight * Gamma.T  # f lineáris tagja a yaw-hibából
+        self.R = R
+        self.DRd = D.T @ Rd
+        self.H = yaw_weight * Gamma.T @ Gamma + R + D.T @ Rd @ D
+        self.H_inv = np.linalg.inv(self.H)  # ha egy korlát sem aktív, ez a teljes megoldás
+
+
+# Modell-prediktív drift vezérlő. A modellt irányonként egyszer, a kért yaw_rate-hez tartozó
+# drift egyensúlyban (drift_trim, trim_steering kormányállással) linearizáljuk, és a predikciós
+# mátrixokat eltároljuk; a bemenetek referenciája is ez az egyensúly. A 2 m/s körüli donut
+# nyílt hurokban instabil, és a kormány ott telítésben van, ezért a gáz (a sebességen és a
+# hátsó tapadáson át) a fő beavatkozó: a modellnek ezt is tartalmaznia kell. A dobozkorlátos QP-t aktív halmazos
+# módszerrel oldjuk meg, az előző tick aktív korlátaiból indítva (meleg indítás), így
+# állandósult állapotban általában 1-2 lineáris egyenletrendszer elég. Ha a megoldás
+# nem fér bele a budget-be, az utolsó érvényes parancsot adjuk vissza.
+# direction: a körözés iránya (a yaw_rate előjele, pl. a left_circle / right_circle visszatérési
+# értéke). Ha nincs megadva, az első olyan ticknél rögzítjük, ahol |yaw_rate| >= latch_yaw_rate,
+# addig nem vezérlünk, és utána sem váltunk irányt, ha a yaw_rate átmegy a nullán.
+# trim_steering: a drift egyensúly kormányállása; a jó érték a céltól függ (2 rad/s-hoz 0.8-0.9,
+# 1.5 rad/s-hoz 0.6 körül tartja a driftet a helyi szimulátoron). ValueError, ha a
+# desired_yaw_rate-hez nincs drift egyensúly.
+class MpcController:
+    def __init__(self, desired_yaw_rate=2, dt=1 / 60, horizon=20, budget=0.004,
+                 yaw_weight=10.0, input_weights=(0.05, 0.05), rate_weights=(2.0, 0.5),
+                 trim_steering=0.8, max_iterations=50, direction=None, latch_yaw_rate=0.5):
+        self.desired_yaw_rate = desired_yaw_rate
+        self.direction = direction
+        self.latch_yaw_rate = latch_yaw_rate
+        self.dt = dt
+        self.horizon = horizon
+        self.budget = budget
+        self.yaw_weight = yaw_weight
+        self.input_weights = np.asarray(input_weights, dtype=float)
+        self.rate_weights = np.asarray(rate_weights, dtype=float)
+        self.trim_steering = trim_steering
+        self.lower = np.tile([-1.0, 0.0], horizon)
+        self.upper = np.tile([1.0, 1.0], horizon)
+        self.max_iterations = max_iterations
+        self.cache = {}
+        self.cache_misses = 0
+        for side in (1, -1):
+            self.prediction(side)  # a trim keresés lassú, nem a vezérlési hurokban csináljuk
+        self.solution = np.zeros(2 * horizon)
+        self.at_lower = np.zeros(2 * horizon, dtype=bool)
+        self.at_upper = np.zeros(2 * horizon, dtype=bool)
+        self.command = (0.0, 0.0)  # utolsó érvényes parancs
+        self.solve_times = LatencyHistogram()
+        self.solves = 0
+        self.overruns = 0
+        self.iterations = 0
+
+    # munkapont: a körözés irányához tartozó drift egyensúly, a bemenet-referenciával együtt
+    def prediction(self, direction):
+        entry = self.cache.get(direction)
+        if entry is None:
+            beta, speed, steering, throttle = drift_trim(direction * self.desired_yaw_rate,
+                                                         self.trim_steering)
+            x0 = np.array([beta, direction * self.desired_yaw_rate, speed])
+            u0 = np.array([steering, throttle])
+            A, B, c = linearize(x0, u0, self.dt)
+            prediction = Prediction(A, B, c, self.horizon, self.yaw_weight,
+                                    self.input_weights, self.rate_weights)
+            entry = self.cache[direction] = (prediction, np.tile(u0, self.horizon))
+            self.cache_misses += 1
+        return entry
+
+    # sideslip: a StateEstimator becslése; nélküle a vezérlő nem tudja megtartani a driftet
+    def update(self, yaw_rate, speed, sideslip=0.0):
+        start = time.perf_counter()
+        deadline = start + self.budget
+        if self.direction is None:
+            if abs(yaw_rate) < self.latch_yaw_rate:
+                return self.command
+            self.direction = 1 if yaw_rate > 0 else -1
+        direction = self.direction
+        p, u_ref = self.prediction(direction)
+        x0 = np.array([sideslip, yaw_rate, speed])
+        r_ref = direction * self.desired_yaw_rate
+        u_prev = np.zeros_like(self.solution)
+        u_prev[:2] = self.command
+
+        f = p.G @ (p.Phi @ x0 + p.C - r_ref) - p.R @ u_ref - p.DRd @ u_prev
+
+        U, converged, iteration = self.solve(p, f, deadline)
+        elapsed = time.perf_counter() - start
+        self.solve_times.add(elapsed)
+        self.solves += 1
+        self.iterations += iteration
+        self.solution = U
+        if converged and elapsed <= self.budget:
+            self.command = (float(U[0]), float(U[1]))
+        else:
+            self.overruns += 1
+        return self.command
+
+    # min 1/2 U'HU + f'U, lower <= U <= upper
+    def solve(self, p, f, deadline):
+        # korlátok nélkül (a leggyakoribb eset egy cache-elt mátrixszorzás)
+        U = -p.H_inv @ f
+        if np.all(U >= self.lower) and np.all(U <= self.upper):
+            self.at_lower[:] = False
+            self.at_upper[:] = False
+            return U, True, 1
+
+        # meleg indítás: az előző tick aktív korlátai egy lépéssel eltolva
+        at_lower = np.concatenate([self.at_lower[2:], self.at_lower[-2:]])
+        at_upper = np.concatenate([self.at_upper[2:], self.at_upper[-2:]])
+        for iteration in range(1, self.max_iterations + 1):
+            U = np.where(at_lower, self.lower, np.where(at_upper, self.upper, 0.0))
+            free = ~(at_lower | at_upper)
+            if free.any():
+                rhs = -(f[free] + p.H[np.ix_(free, ~free)] @ U[~free])
+                U[free] = np.linalg.solve(p.H[np.ix_(free, free)], rhs)
+
+            below = free & (U < self.lower)
+            above = free & (U > self.upper)
+            if below.any() or above.any():
+                at_lower |= below
+                at_upper |= above
+            else:
+                # a korláton tartott változók gradiense mutat-e befelé: ha igen, elengedjük
+                gradient = p.H @ U + f
+                release_lower = at_lower & (gradient < 0)
+                release_upper = at_upper & (gradient > 0)
+                if not (release_lower.any() or release_upper.any()):
+                    self.at_lower, self.at_upper = at_lower, at_upper
+                    return U, True, iteration
+                at_lower &= ~release_lower
+                at_upper &= ~release_upper
+            if time.perf_counter() > deadline:
+                break
+        self.at_lower, self.at_upper = at_lower, at_upper
+        return np.clip(U, self.lower, self.upper), False, iteration
+
+    def report(self):
+        h = self.solve_times
+        if not h.count:
+            return
+        print(f"MPC: {self.solves} solves, {self.overruns} overruns (budget {self.budget * 1000:.1f} ms), "
+              f"{self.iterations / self.solves:.1f} iterations/solve")
+        print(f"  solve time: p50 {h.percentile(50) * 1000:.3f} ms, p95 {h.percentile(95) * 1000:.3f} ms, "
+              f"p99 {h.percentile(99) * 1000:.3f} ms, max {h.max * 1000:.3f} ms")
+
+
+# Zárt hurkú próba a helyi szimulátoron 60 Hz-en: belefér-e a megoldás a tick idejébe, és
+# az utolsó 10 másodpercben a yaw_rate a cél ±10%-os sávjában marad-e (mindkét irányba)
+def main(ticks=3000, band=0.1):
+    from local_sim import LocalSim
+
+    controller = None
+    for direction in (1, -1):
+        sim = LocalSim()
+        controller = MpcController(direction=direction)
+        sim.vehicle.control(steering=-direction, throttle=1)
+        sim.sleep(2)
+        target = direction * controller.desired_yaw_rate
+        yaw_rates = np.empty(ticks)
+        start = time.perf_counter()
+        for tick in range(ticks):
+            sim.step(1)
+            yaw_rates[tick] = sim.yaw_rate[0]
+            steering, throttle = controller.update(float(sim.yaw_rate[0]), float(sim.speed[0]),
+                                                   float(sim.sideslip[0]))
+            sim.vehicle.control(steering=steering, throttle=throttle, brake=0)
+        elapsed = time.perf_counter() - start
+        tail = yaw_rates[-600:]
+        error = np.abs(yaw_rates - target) > band * abs(target)
+        settled = (np.flatnonzero(error)[-1] + 1) / 60 if error.any() else 0.0
+        print(f"direction {direction:+d}: {ticks} ticks in {elapsed:.2f} s ({ticks / elapsed:.0f} Hz achievable), "
+              f"yaw_rate {tail.mean():.3f} (target {target}), rmse {np.sqrt(np.mean((tail - target) ** 2)):.3f}, "
+              f"settled after {settled:.1f} s")
+        assert np.all(np.abs(tail - target) <= band * abs(target)), \
+            f"yaw_rate left the ±{band:.0%} band around {target}: {tail.min():.3f} .. {tail.max():.3f}"
+    controller.report()
+
+if __name__ == "__main__":
+    main()
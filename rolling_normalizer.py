@@ -0,0 +1,61 @@
+from collections import deque
+
+
+# Fix méretű csúszóablak a yaw_rate / angAccel normalizálásához.
+# A min/max-ot monoton deque-kkel tartjuk karban, így nem kell minden
+# tickben végigmenni a listán (min()/max()), és a pop(0) sem kell.
+class RollingNormalizer:
+    def __init__(self, size=20):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.buffer = [0.0] * size
+        self.count = 0  # eddig összesen beérkezett minták száma
+        self.min_deque = deque()  # (index, érték), növekvő értékek
+        self.max_deque = deque()  # (index, érték), csökkenő értékek
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def __iter__(self):
+        # a legrégebbitől a legfrissebbig
+        start = self.count - len(self)
+        for i in range(start, self.count):
+            yield self.buffer[i % self.size]
+
+    def append(self, value):
+        index = self.count
+        self.buffer[index % self.size] = value
+        self.count += 1
+
+        while self.min_deque and self.min_deque[-1][1] >= value:
+            self.min_deque.pop()
+        self.min_deque.append((index, value))
+        while self.max_deque and self.max_deque[-1][1] <= value:
+            self.max_deque.pop()
+        self.max_deque.append((index, value))
+
+        # ami kiesett az ablakból, azt eldobjuk
+        oldest = self.count - self.size
+        if self.min_deque[0][0] < oldest:
+            self.min_deque.popleft()
+        if self.max_deque[0][0] < oldest:
+            self.max_deque.popleft()
+
+    def min(self):
+        return self.min_deque[0][1]
+
+    def max(self):
+        return self.max_deque[0][1]
+
+    # -1 és 1 közé skálázza az értéket az ablak min/max-a alapján.
+    # Ha az ablakban minden érték egyforma (nulla a tartomány), 0-t ad vissza
+    # a nullával osztás helyett.
+    def normalize(self, value):
+        if not self.count:
+            return 0.0
+        low = self.min_deque[0][1]
+        value_range = self.max_deque[0][1] - low
+        if value_range == 0:
+            return 0.0
+        return -1 + 2 * ((value - low) / value_range)
@@ -1,52 +1,32 @@
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy.stats import linregress
 import random
 from time import sleep
 import math
 import logging
 
-from beamngpy import BeamNGpy, Scenario, Vehicle, set_up_simple_logging
+from beamngpy import set_up_simple_logging
 from beamngpy.sensors import AdvancedIMU, Electrics, Sensor, PowertrainSensor
 
-def cooling(vehicle):
-    vehicle.control(steering=0, throttle=0.2, brake=0, parkingbrake=0,clutch=0, gear=3)
-    sleep(10)
-    electrics_data = vehicle.sensors["electrics"]
-    while round(electrics_data["wheelspeed"],1) != 0:
-        vehicle.sensors.poll()
-        electrics_data = vehicle.sensors["electrics"]
-        vehicle.control(steering=0, throttle=0, brake=1)
-    vehicle.control(steering=0, throttle=1, brake=0)
+from rolling_normalizer import RollingNormalizer
+from session_manager import DriftSession
+from imu_batch import ImuBatch
+from direction_classifier import DirectionClassifier
+from cooling_state import CoolingStateMachine
 
 def main():
     random.seed(1703)
     set_up_simple_logging()
     logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-    beamng = BeamNGpy("localhost", 25252, home="F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0")
-    bng = beamng.open(launch=True)
-
-    scenario = Scenario("smallgrid","autonomous_drifting_demo",)
-    vehicle = Vehicle("ego_vehicle", model="etk800", license="SPEED-007", color="Blue")
-
-    scenario.add_vehicle(vehicle, pos=(0,0,0))
-    scenario.make(bng)
-
-    bng.settings.set_deterministic(60)  # Set simulator to 60hz temporal resolution
-
-    bng.scenario.load(scenario)
-    bng.scenario.start()
-    
-    options = vehicle.get_part_options()
-
     config = {
         "etk800_differential_R": "etk800_differential_R_active_LSD",
         "etk800_radiator": "etk800_radiator_high_performance",
         "etk800_steering_wide":"etk800_steering_wide_drift",
         "etk_engine":"etk_engine_v8_4.4_petrol",
         "etk_intake_v8_4.4_petrol":"etk_intake_v8_4.4_petrol_rennspecht"}
-    vehicle.set_part_config({"parts":config})
+
+    # ha már fut a BeamNG, csatlakozunk hozzá, és a scenariót / alkatrészeket csak szükség esetén töltjük újra
+    session = DriftSession("F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0", parts=config).open()
+    bng, vehicle = session.bng, session.vehicle
 
     imu = AdvancedIMU("accel1", bng, vehicle, gfx_update_time=0.01)
     electrics = Electrics()
@@ -60,11 +40,11 @@ def main():
 
     
 
-    acc_historyX = []
+    classifierX = DirectionClassifier(window=10)
     regressedX = []
 
-    yaw_rates = []
-    velocities = []
+    yaw_rates = RollingNormalizer(20)
+    velocities = RollingNormalizer(20)
 
     log_data = []
     i = 0
@@ -72,7 +52,9 @@ def main():
     normalized_yaw_rate = 0
     normalized_velocity = 0
     directions = []
-    previous_directions = 0
+    # 10 másodpercig gurul lassan, megáll, majd egyenesen teljes gázzal indul
+    cooling_state = CoolingStateMachine(cool_temperature=None, cool_seconds=10, stop_wait=0,
+                                        relaunch_steering=0, relaunch_seconds=0)
     while True:
         sleep(0.1)  # Include a small delay between each reading.
         vehicle.sensors.poll()
@@ -81,11 +63,9 @@ def main():
         speed = electrics_data["virtualAirspeed"]
 
 
-        data = imu.poll()  # Fetch the latest readings from the sensor.
-        data = data[0.0]
+        data = ImuBatch(imu.poll()).latest()  # Fetch the latest readings from the sensor.
 
-        if electrics_data["water_temperature"] > 115:
-            cooling(vehicle)
+        cooling_state.update(vehicle, electrics_data["water_temperature"], electrics_data["wheelspeed"], data["time"])
 
         accSmooth = data["accSmooth"] # linearis gyorsulas
 
@@ -95,8 +75,8 @@ def main():
         yaw_rates.append(yaw_rate)
 
         if len(yaw_rates) > 1:
-            normalized_yaw_rate = -1 + 2 * ((yaw_rate - min(yaw_rates)) / (max(yaw_rates) - min(yaw_rates)))
-            normalized_velocity = -1 + 2 * ((velocity - min(velocities)) / (max(velocities) - min(velocities)))
+            normalized_yaw_rate = yaw_rates.normalize(yaw_rate)
+            normalized_velocity = velocities.normalize(velocity)
 
             steering = normalized_yaw_rate+normalized_velocity
 
@@ -110,35 +90,12 @@ def main():
 
 
 
-        acc_historyX.append(accSmooth[0])
-        if len(acc_historyX) > 10:
-            acc_historyX.pop(0)
-
-        # Lineáris regresszió számítása
-        Xx = np.arange(len(acc_historyX))  # X tengely: indexek
-        Xy = np.array(acc_historyX)  # Y tengely: gyorsulás adatok
-
-        slope, intercept, _, _, _ = linregress(Xx, Xy)
-        acc_regressedX = slope * (len(acc_historyX) - 1) + intercept  # Legfrissebb becsült érték
+        # Lineáris regresszió az utolsó 10 mintára, ebből az előre/hátra irány
+        direction = classifierX.update(accSmooth[0])
+        acc_regressedX = classifierX.regressed
+        threshold = classifierX.threshold
         regressedX.append(acc_regressedX)
 
-        threshold = max(0.05, np.std(acc_historyX) * 1.2)
-
-        if acc_regressedX > threshold:
-            direction = "Forward"
-            previous_directions = 1
-        elif acc_regressedX < -threshold:
-            direction = "Backward"
-            previous_directions = -1
-        else:
-            if previous_directions != 0:
-                if previous_directions > 0:
-                    direction = "Forward"
-                else: 
-                    direction = "Backward"
-            else:
-                direction = "Stationary"
-
 
         if abs(yaw_rate) > 0.2:  # Ha van számottevő szögsebesség
             turn_direction = "Right" if yaw_rate > 0 else "Left"
@@ -179,12 +136,12 @@ def main():
     print()
     print()
 
-    print(yaw_rates)
+    print(list(yaw_rates))
 
     print()
     print()
 
-    print(velocities)
+    print(list(velocities))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+import threading
+import time
+
+
+# Kétrekeszes puffer: az író mindig a nem olvasott rekeszbe ír, utána egyetlen
+# értékadással átfordítja az indexet. Az olvasó zár nélkül mindig a legfrissebb
+# teljes mintát kapja (a GIL miatt az index átírása atomi).
+class DoubleBuffer:
+    def __init__(self):
+        self.slots = [None, None]
+        self.index = 0
+        self.stamp = None  # perf_counter idő az utolsó íráskor
+        self.count = 0
+
+    def write(self, value):
+        back = 1 - self.index
+        self.slots[back] = value
+        self.index = back
+        self.stamp = time.perf_counter()
+        self.count += 1
+
+    def read(self):
+        return self.slots[self.index]
+
+
+# Az AdvancedIMU.poll() csak az előző poll óta gyűlt mintákat adja vissza, ezért az IMU szál
+# pollját nem írhatjuk felül: a minták ide gyűlnek, és a vezérlő olvasása mind kiveszi
+# (így az ImuBatch továbbra is az előző tick óta érkezett összes mintát kapja). Ha nincs új
+# minta, a legutóbbit adjuk vissza, mint a poll (a get_data since szűrője ezt eldobja).
+# Ha a vezérlő elakad, legfeljebb max_samples mintát tartunk meg, a legrégebbiek vesznek el.
+class SampleQueue:
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self.samples = []
+        self.lock = threading.Lock()
+        self.latest = None
+        self.stamp = None
+        self.count = 0
+        self.dropped = 0
+
+    def write(self, readings):
+        samples = [readings[key] for key in sorted(readings)]
+        if not samples:
+            return
+        with self.lock:
+            self.samples.extend(samples)
+            overflow = len(self.samples) - self.max_samples
+            if overflow > 0:
+                del self.samples[:overflow]
+                self.dropped += overflow
+            self.latest = samples[-1]
+        self.stamp = time.perf_counter()
+        self.count += 1
+
+    def read(self):
+        with self.lock:
+            samples, self.samples = self.samples, []
+            latest = self.latest
+        if not samples:
+            samples = [latest] if latest is not None else []
+        return {float(i): sample for i, sample in enumerate(samples)}
+
+
+# Háttérszálas szenzorolvasás: az IMU-t és az electrics-et külön szál poll-olja; az electrics
+# legfrissebb mintája DoubleBuffer-be, az IMU minták SampleQueue-ba kerülnek. A vezérlő várakozás nélkül olvas, a
+# vehicle.control parancsok pedig egy összevonó (coalescing) sorba kerülnek: ha a
+# küldés előtt több parancs is jön, csak a kulcsonként legutolsó érték megy ki.
+# A vehicle.control és a vehicle.sensors.poll ugyanazt a kapcsolatot használja, ezért
+# ugyanaz a szál küldi a parancsot és olvassa az electrics-et; az IMU a játék
+# kapcsolatán megy, az a másik szálon fut. A --stepped móddal nem használható együtt,
+# mert a léptetés is a játék kapcsolatát használná.
+class SensorPipeline:
+    def __init__(self, vehicle, imu, imu_period=0.01, electrics_period=0.01):
+        self.real_vehicle = vehicle
+        self.real_imu = imu
+        self.imu_period = imu_period
+        self.electrics_period = electrics_period
+        self.buffers = {"imu": SampleQueue(), "electrics": DoubleBuffer()}
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.sent_commands = 0
+        self.coalesced_commands = 0
+        self.error = None
+        self.stopped = threading.Event()
+        self.threads = [
+            threading.Thread(target=self.run, args=("imu", self.poll_imu, imu_period), daemon=True),
+            threading.Thread(target=self.run, args=("electrics", self.poll_vehicle, electrics_period), daemon=True),
+        ]
+        self.vehicle = PipelineVehicle(self)
+        self.imu = PipelineIMU(self)
+
+    def start(self, timeout=5.0):
+        for thread in self.threads:
+            thread.start()
+        # az első mintákig megvárjuk, hogy a vezérlő ne kapjon None-t
+        deadline = time.perf_counter() + timeout
+        while any(b.count == 0 for b in self.buffers.values()):
+            self.check()
+            if time.perf_counter() > deadline:
+                raise TimeoutError("no sensor data from the pipeline")
+            time.sleep(0.001)
+
+    def stop(self):
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
+        self.flush_commands()
+
+    def run(self, name, poll, period):
+        buffer = self.buffers[name]
+        try:
+            while not self.stopped.is_set():
+                start = time.perf_counter()
+                buffer.write(poll())
+                rest = period - (time.perf_counter() - start)
+                if rest > 0:
+                    self.stopped.wait(rest)
+        except Exception as e:
+            self.error = e
+
+    def poll_imu(self):
+        return self.real_imu.poll()
+
+    def poll_vehicle(self):
+        self.flush_commands()
+        self.real_vehicle.sensors.poll()
+        return dict(self.real_vehicle.sensors["electrics"])
+
+    def send(self, command):
+        with self.pending_lock:
+            if self.pending:
+                self.coalesced_commands += 1
+            self.pending.update(command)
+
+    def flush_commands(self):
+        with self.pending_lock:
+            command, self.pending = self.pending, {}
+        if command:
+            self.real_vehicle.control(**command)
+            self.sent_commands += 1
+
+    def check(self):
+        if self.error is not None:
+            raise RuntimeError("sensor pipeline thread failed") from self.error
+
+    def read(self, name):
+        self.check()
+        return self.buffers[name].read()
+
+    # mennyi ideje (másodperc) érkezett az utolsó minta szenzoronként
+    def staleness(self):
+        now = time.perf_counter()
+        return {name: now - b.stamp if b.stamp is not None else None for name, b in self.buffers.items()}
+
+    def report(self):
+        staleness = self.staleness()
+        for name, buffer in self.buffers.items():
+            age = staleness[name]
+            age = f"{age * 1000:.1f} ms" if age is not None else "-"
+            print(f"  {name}: {buffer.count} samples, staleness {age}")
+        print(f"  imu: {self.buffers['imu'].dropped} samples dropped (controller too slow)")
+        print(f"  commands: {self.sent_commands} sent, {self.coalesced_commands} coalesced")
+
+
+# A scriptek felé ugyanaz a felület, mint a valódi vehicle / imu objektumoké,
+# így a get_data és a control_loop változtatás nélkül használható.
+class PipelineSensors:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def poll(self):
+        self.pipeline.check()
+
+    def __getitem__(self, name):
+        return self.pipeline.read(name)
+
+
+class PipelineVehicle:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.sensors = PipelineSensors(pipeline)
+
+    def control(self, **kwargs):
+        self.pipeline.send(kwargs)
+
+
+class PipelineIMU:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def poll(self):
+        return self.pipeline.read("imu")
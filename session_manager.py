@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+
+from beamngpy import BeamNGpy, Scenario, Vehicle
+from beamngpy.logging import BNGValueError
+
+CACHE_DIR = ".beamng_cache"
+
+
+# A part config fája -> {slot: választott alkatrész}
+def flatten_parts(tree, parts=None):
+    parts = {} if parts is None else parts
+    if tree.get("id") and tree.get("chosenPartName") is not None:
+        parts[tree["id"]] = tree["chosenPartName"]
+    for child in (tree.get("children") or {}).values():
+        flatten_parts(child, parts)
+    return parts
+
+
+# A part config fája -> {slot: választható alkatrészek}
+def part_options_from_tree(tree, options=None):
+    options = {} if options is None else options
+    if tree.get("id"):
+        options[tree["id"]] = tree.get("suitablePartNames", [])
+    for child in (tree.get("children") or {}).values():
+        part_options_from_tree(child, options)
+    return options
+
+
+# Gyors indítás: ha a porton már fut egy BeamNG, ahhoz csatlakozunk, és ha éppen a mi
+# scenariónk van betöltve, csak újraindítjuk (nincs pályatöltés). A scenario fájlokat
+# csak akkor generáljuk újra (scenario.make), ha a tartalmuk megváltozott, az alkatrészeket
+# csak akkor állítjuk be, ha eltérnek (a set_part_config újraspawnolja az autót), a
+# választható alkatrészek listáját pedig lemezen tároljuk (ezzel ellenőrizzük a kért
+# alkatrészeket).
+# Kilépéskor alapból csak lecsatlakozunk, a szimulátor fut tovább a következő futásig.
+class DriftSession:
+    def __init__(self, home, port=25252, level="smallgrid", name="autonomous_drifting_demo",
+                 model="etk800", parts=None, cache_dir=CACHE_DIR, keep_running=True):
+        self.home = home
+        self.port = port
+        self.level = level
+        self.name = name
+        self.model = model
+        self.parts = parts or {}
+        self.cache_dir = cache_dir
+        self.keep_running = keep_running
+        self.bng = None
+        self.scenario = None
+        self.vehicle = None
+        self.attached = False
+        self.reused_scenario = False
+
+    def open(self):
+        self.bng = BeamNGpy("localhost", self.port, home=self.home, quit_on_close=not self.keep_running)
+        self.bng.open(launch=True)
+        self.attached = self.bng.process is None  # nem mi indítottuk
+        self.reused_scenario = self.attached and self.reuse_scenario()
+        if not self.reused_scenario:
+            self.load_scenario()
+        self.bng.settings.set_deterministic(60)  # 60 Hz fizika
+        self.apply_parts()
+        return self
+
+    def close(self):
+        if self.bng is None:
+            return
+        if self.keep_running:
+            self.bng.disconnect()
+        else:
+            self.bng.close()
+        self.bng = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def cache_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def read_cache(self, name):
+        try:
+            with open(self.cache_path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_cache(self, name, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.cache_path(name) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.cache_path(name))
+
+    def build_scenario(self):
+        scenario = Scenario(self.level, self.name)
+        vehicle = Vehicle("ego_vehicle", model=self.model, license="SPEED-007", color="Blue")
+        scenario.add_vehicle(vehicle, pos=(0, 0, 0))
+        return scenario, vehicle
+
+    # a futó szimulátorban a mi scenariónk van-e betöltve: ha igen, újraindítjuk
+    def reuse_scenario(self):
+        try:
+            current = self.bng.scenario.get_current(connect=False)
+        except BNGValueError:
+            return False
+        if current.name != self.name or current.level != self.level or "ego_vehicle" not in current.vehicles:
+            return False
+        current.connect(self.bng)
+        self.bng._scenario = current
+        self.scenario = current
+        self.vehicle = current.vehicles["ego_vehicle"]
+        self.bng.scenario.restart()
+        return True
+
+    def load_scenario(self):
+        scenario, vehicle = self.build_scenario()
+        fingerprint = hashlib.sha1(json.dumps(
+            [scenario._get_prefab(), scenario._get_info_dict()], sort_keys=True).encode()).hexdigest()
+        cached = self.read_cache("scenarios.json") or {}
+        key = f"{self.level}/{self.name}"
+        if cached.get(key) != fingerprint or scenario.find(self.bng) is None:
+            scenario.make(self.bng)
+            cached[key] = fingerprint
+            self.write_cache("scenarios.json", cached)
+        self.bng.scenario.load(scenario)
+        self.bng.scenario.start()
+        self.scenario = scenario
+        self.vehicle = vehicle
+
+    # friss betöltésnél az autó alapkonfigurációban van, úgyhogy nem kérdezzük le
+    def apply_parts(self):
+        if not self.parts:
+            return
+        if self.reused_scenario:
+            current = flatten_parts(self.vehicle.get_part_config())
+            if all(current.get(slot) == part for slot, part in self.parts.items()):
+                return
+        self.check_parts()
+        self.vehicle.set_part_config({"parts": self.parts})
+
+    # a választható alkatrészek (a lassú get_part_options helyett), modellenként lemezen tárolva
+    def part_options(self, refresh=False):
+        name = f"part_options_{self.model}.json"
+        options = None if refresh else self.read_cache(name)
+        if options is None:
+            options = part_options_from_tree(self.vehicle.get_part_config())
+            self.write_cache(name, options)
+        return options
+
+    # A set_part_config az ismeretlen alkatrészt szó nélkül kihagyja, ezért előtte ellenőrizzük.
+    # Csak az ismert slotokat nézzük (egy alkatrész új slotokat is hozhat), a "" az alkatrész
+    # eltávolítása. Ha a tárolt lista szerint hibás, egyszer frissítjük (pl. új mod).
+    def check_parts(self):
+        for refresh in (False, True):
+            options = self.part_options(refresh)
+            invalid = {slot: part for slot, part in self.parts.items()
+                       if part and slot in options and part not in options[slot]}
+            if not invalid:
+                return
+        raise ValueError(f"unknown parts for {self.model}: {invalid}")
@@ -0,0 +1,108 @@
+import math
+
+
+def wrap_angle(angle):
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+# Járműállapot-becslő az AdvancedIMU mezőiből, tickenként:
+# - yaw_rate: skalár Kalman-szűrő, az angAccel[2]-vel jósol és az angVel[2]-vel javít
+# - heading: komplementer szűrő, a yaw_rate integrálja a dirX irányához húzva
+# - síkbeli pozíció / sebesség: Kalman-szűrő tengelyenként [p, v] állapottal, az accSmooth-ot
+#   (jármű keret: x előre, z jobbra) világkeretbe forgatva bemenetként, a pos-t mérésként használva.
+#   A két tengely zaja azonos, így a kovariancia is: egyetlen 2x2-es mátrix (3 szám) elég.
+# Ebből: hossz- és keresztirányú sebesség (balra pozitív) és a sideslip (béta).
+# Minden állapot sima float attribútum, tickenként nincs tömb-foglalás.
+class StateEstimator:
+    def __init__(self, position_noise=0.05, accel_noise=8.0, gyro_noise=0.05, yaw_accel_noise=20.0,
+                 heading_gain=0.3, min_speed=1.0):
+        self.position_variance = position_noise ** 2
+        self.accel_variance = accel_noise ** 2
+        self.gyro_variance = gyro_noise ** 2
+        self.yaw_accel_variance = yaw_accel_noise ** 2
+        self.heading_gain = heading_gain
+        self.min_speed = min_speed
+        self.reset()
+
+    def reset(self):
+        self.time = None
+        self.x = self.y = 0.0
+        self.vx = self.vy = 0.0
+        self.p_pp = self.p_pv = self.p_vv = 0.0
+        self.yaw_rate = 0.0
+        self.p_r = 0.0
+        self.heading = 0.0
+        self.v_long = self.v_lat = 0.0
+        self.speed = 0.0
+        self.sideslip = 0.0
+
+    def update(self, imu_data):
+        self.step(imu_data["time"], imu_data["pos"], imu_data["dirX"], imu_data["angVel"][2],
+                  imu_data["angAccel"][2], imu_data["accSmooth"])
+
+    # egy poll összes mintája (imu_batch.ImuBatch) időrendben, mindegyik a saját idejével
+    def update_batch(self, batch):
+        for now, pos, forward, ang_vel, ang_accel, acc in zip(
+                batch.time.tolist(), batch.pos.tolist(), batch.dirX.tolist(), batch.angVel.tolist(),
+                batch.angAccel.tolist(), batch.accSmooth.tolist()):
+            self.step(now, pos, forward, ang_vel[2], ang_accel[2], acc)
+
+    def step(self, now, pos, forward, measured_yaw_rate, yaw_accel, acc):
+        measured_heading = math.atan2(forward[1], forward[0])
+
+        if self.time is None:
+            self.time = now
+            self.x, self.y = pos[0], pos[1]
+            self.p_pp = self.position_variance
+            self.p_vv = 100.0  # a kezdősebességet nem ismerjük
+            self.yaw_rate = measured_yaw_rate
+            self.p_r = self.gyro_variance
+            self.heading = measured_heading
+            return
+        dt = now - self.time
+        if dt <= 0:  # ugyanaz a frame még egyszer
+            return
+        self.time = now
+
+        # yaw_rate
+        self.yaw_rate += yaw_accel * dt
+        self.p_r += self.yaw_accel_variance * dt * dt
+        gain = self.p_r / (self.p_r + self.gyro_variance)
+        self.yaw_rate += gain * (measured_yaw_rate - self.yaw_rate)
+        self.p_r *= 1 - gain
+
+        # heading
+        predicted = self.heading + self.yaw_rate * dt
+        self.heading = wrap_angle(predicted + self.heading_gain * wrap_angle(measured_heading - predicted))
+        c, s = math.cos(self.heading), math.sin(self.heading)
+
+        # predikció: a jármű keretű gyorsulás világkeretben (jobbra = (s, -c))
+        ax = acc[0] * c + acc[2] * s
+        ay = acc[0] * s - acc[2] * c
+        half_dt2 = 0.5 * dt * dt
+        self.x += self.vx * dt + ax * half_dt2
+        self.y += self.vy * dt + ay * half_dt2
+        self.vx += ax * dt
+        self.vy += ay * dt
+        q = self.accel_variance
+        p_pp = self.p_pp + 2 * dt * self.p_pv + dt * dt * self.p_vv + q * half_dt2 * half_dt2
+        p_pv = self.p_pv + dt * self.p_vv + q * half_dt2 * dt
+        p_vv = self.p_vv + q * dt * dt
+
+        # javítás a mért pozícióval
+        k_p = p_pp / (p_pp + self.position_variance)
+        k_v = p_pv / (p_pp + self.position_variance)
+        dx = pos[0] - self.x
+        dy = pos[1] - self.y
+        self.x += k_p * dx
+        self.y += k_p * dy
+        self.vx += k_v * dx
+        self.vy += k_v * dy
+        self.p_pp = (1 - k_p) * p_pp
+        self.p_pv = (1 - k_p) * p_pv
+        self.p_vv = p_vv - k_v * p_pv
+
+        self.v_long = self.vx * c + self.vy * s
+        self.v_lat = -self.vx * s + self.vy * c
+        self.speed = math.hypot(self.vx, self.vy)
+        self.sideslip = math.atan2(self.v_lat, abs(self.v_long)) if self.speed > self.min_speed else 0.0
@@ -0,0 +1,31 @@
+from tick_profiler import TickProfiler
+
+
+# Lépésenkénti (determinisztikus) futtatás: a szimulátor áll, és minden
+# tick előtt pontosan steps_per_tick fizikai lépést léptetünk rajta.
+# Így nem a time.sleep(0.1)-től függ, hogy a vezérlő melyik frame-eket látja,
+# és a ciklus olyan gyorsan megy, amilyen gyorsan a szimulátor bírja.
+class SteppedRunner:
+    def __init__(self, bng, steps_per_tick=6, physics_rate=60, profiler=None):
+        self.bng = bng
+        self.steps_per_tick = steps_per_tick
+        self.physics_rate = physics_rate
+        self.profiler = profiler if profiler is not None else TickProfiler(enabled=False)
+
+    def start(self):
+        self.bng.control.pause()
+
+    def stop(self):
+        self.bng.control.resume()
+
+    def step(self, count):
+        with self.profiler.span("step"):
+            self.bng.control.step(count, wait=True)
+
+    def advance(self):
+        self.step(self.steps_per_tick)
+
+    # time.sleep helyett: a várakozást fizikai lépésekre váltja át,
+    # de legalább egyet lép, hogy a poll-oló ciklusok is haladjanak
+    def sleep(self, seconds):
+        self.step(max(1, round(seconds * self.physics_rate)))
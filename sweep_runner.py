@@ -0,0 +1,304 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fifth_test
+from circle_fit import CircleFitter
+from cooling_state import CoolingStateMachine
+from imu_batch import ImuBatch
+from local_sim import LocalSim
+from rolling_normalizer import RollingNormalizer
+from stepped_loop import SteppedRunner
+
+# Paraméter-sweep: pálya / alkatrész-konfiguráció / erősítés kombinációk párhuzamosan,
+# processzenként saját szimulátor-példánnyal (BeamNG esetén saját porttal).
+# A "local" backend a local_sim.LocalSim-et használja, BeamNG nélkül is fut.
+
+PART_CONFIGS = {
+    "rwd_active_lsd": fifth_test.PART_CONFIG,
+    "awd_active_lsd": {**fifth_test.PART_CONFIG, "etk800_transfer_case": "etk800_transfer_case_AWD"},
+    "fwd": {},
+}
+# a konfigurációk járműve (alapból etk800) és hajtása (a LocalSim ez alapján osztja el a hajtóerőt);
+# az etk800-nak nincs elsőkerék-hajtású változata, ezért az FWD a gyári Ibishu Covet
+VEHICLE_MODELS = {"fwd": "covet"}
+DRIVETRAINS = {"rwd_active_lsd": "RWD", "awd_active_lsd": "AWD", "fwd": "FWD"}
+
+GAIN_NAMES = ["desired_yaw_rate", "aggression", "error_threshold", "throttle_floor", "Kp", "Ki", "Kd"]
+
+
+def make_grid(levels, part_configs, **gain_values):
+    names = [name for name in GAIN_NAMES if name in gain_values]
+    jobs = []
+    for level, part_config in itertools.product(levels, part_configs):
+        for values in itertools.product(*(gain_values[name] for name in names)):
+            jobs.append({"level": level, "part_config": part_config, "gains": dict(zip(names, values))})
+    return jobs
+
+
+# A get_data-nak átadott IMU: a legutóbbi poll mintáit megtartja, hogy a tick után (a mért
+# vezérlési időn kívül) mintánként is végignézhessük őket
+class ImuTap:
+    def __init__(self, imu):
+        self.imu = imu
+        self.readings = {}
+
+    def poll(self):
+        self.readings = self.imu.poll()
+        return self.readings
+
+
+class LocalBackend:
+    def __init__(self, job):
+        self.sim = LocalSim(drivetrain=DRIVETRAINS.get(job["part_config"], "RWD"))
+        self.sim.buffer_imu(0)
+        # a seed szerinti kis gördülési sebesség indításkor, különben a seedek csak tükörképek
+        self.sim.vx[0] = random.uniform(0.0, 1.0)
+        self.vehicle = self.sim.vehicle
+        self.imu = self.sim.imu
+
+    def advance(self):
+        self.sim.step(6)
+
+    def sleep(self, seconds):
+        self.sim.sleep(seconds)
+
+    def close(self):
+        pass
+
+
+# Worker processzenként egy BeamNG példány, az első feladatnál indul és utána újrahasználjuk
+worker_port = None
+worker_beamng = None
+
+
+def init_worker(ports):
+    global worker_port
+    worker_port = ports.get()
+
+
+class BeamNGBackend:
+    def __init__(self, job, home):
+        global worker_beamng
+        from beamngpy import BeamNGpy, Scenario, Vehicle
+        from beamngpy.sensors import AdvancedIMU, Electrics
+
+        if worker_beamng is None:
+            worker_beamng = BeamNGpy("localhost", worker_port, home=home).open(launch=True)
+        bng = worker_beamng
+
+        scenario = Scenario(job["level"], "autonomous_drifting_sweep")
+        model = VEHICLE_MODELS.get(job["part_config"], "etk800")
+        self.vehicle = Vehicle("ego_vehicle", model=model, license="SPEED-007", color="Blue")
+        scenario.add_vehicle(self.vehicle, pos=(0, 0, 0))
+        scenario.make(bng)
+        bng.settings.set_deterministic(60)
+        bng.scenario.load(scenario)
+        bng.scenario.start()
+        self.vehicle.set_part_config({"parts": PART_CONFIGS[job["part_config"]]})
+
+        self.imu = AdvancedIMU("accel1", bng, self.vehicle, gfx_update_time=0.01)
+        self.vehicle.sensors.attach("electrics", Electrics())
+        self.vehicle.set_shift_mode("realistic_automatic")
+        self.runner = SteppedRunner(bng, steps_per_tick=6)
+        self.runner.start()
+
+    def advance(self):
+        self.runner.advance()
+
+    def sleep(self, seconds):
+        self.runner.sleep(seconds)
+
+    def close(self):
+        self.imu.remove()
+        self.runner.stop()
+
+
+# A kör stabilitása: a fordulási sugár (sebesség / yaw_rate) relatív szórása.
+# Tökéletes körnél 0, spirálnál vagy kipördülésnél nagy.
+def radius_variation(radii):
+    if len(radii) < 2:
+        return 1.0
+    mean = sum(radii) / len(radii)
+    variance = sum((r - mean) ** 2 for r in radii) / len(radii)
+    return math.sqrt(variance) / mean
+
+
+# a rendezett mintából a q kvantilis (0..1)
+def quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+# Egy feladat: indítás left_circle-lel vagy right_circle-lel (a seed szerint), majd ticks darab
+# get_data + control_loop tick.
+# job["controller"]: "normalization" (fifth_test.control_loop, alapértelmezett) vagy "pid"; a pid
+# desired_yaw_rate-je előjeles, a nagyságát a gains adja, az előjelét az indulás iránya
+# job["target_yaw_rate"]: ehhez mérjük a hibát (alapból a gains desired_yaw_rate-je vagy 2)
+# radius_drift: a pályára illesztett kör sugarának átlagos (abszolút) változási sebessége (m/s), a spirál mértéke
+# time_to_drift: az indítástól addig eltelt szimulált idő, amíg a |yaw_rate| először eléri a
+# drift_yaw_rate-et (job, alapból 1.2, mint a FigureEightScheduler-nél), az IMU mintáinak idejéből,
+# az indítás 2 másodpercét is beleértve (nem csak a tickhatárokon), time_to_overheat: amíg a
+# vízhőmérséklet eléri a hűtés indítási hőmérsékletét; None, ha a futás alatt nem történt meg
+# control_p50_ms / control_p95_ms / control_max_ms: a vezérlő tick (get_data + control loop) ideje
+# job["seed"]: a random seed (alapból 1703, mint a fifth_test-ben), ez választja az indulás irányát
+def run_job(job, backend="local", ticks=300, home=fifth_test.BEAMNG_HOME):
+    random.seed(job.get("seed", 1703))
+    start = time.perf_counter()
+    gains = job["gains"]
+    target_yaw_rate = abs(job.get("target_yaw_rate", gains.get("desired_yaw_rate", 2)))
+    drift_yaw_rate = job.get("drift_yaw_rate", 1.2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = LocalBackend(job) if backend == "local" else BeamNGBackend(job, home)
+        fifth_test.wait = sim.sleep
+        try:
+            # az indítás előtti IMU idő: ettől mérjük a time_to_drift / time_to_overheat értékét
+            sim.advance()
+            start_time = ImuBatch(sim.imu.poll()).latest()["time"]
+            # mint a fifth_test.main-ben: a seed dönti el, balra vagy jobbra indul a kör
+            direction = fifth_test.launch_circle(sim.vehicle)
+            control_gains = gains
+            if job.get("controller") == "pid":
+                desired_yaw_rate = math.copysign(gains.get("desired_yaw_rate", 2), direction)
+                control_gains = {**gains, "desired_yaw_rate": desired_yaw_rate}
+            imu = ImuTap(sim.imu)
+            yaw_rates = RollingNormalizer(20)
+            velocities = RollingNormalizer(20)
+            data_dict = {}
+            cooling_state = CoolingStateMachine()
+            pid_state = {"integral": 0.0, "prev_error": 0.0, "prev_time": None}
+            squared_error = 0.0
+            throttle = 0.0
+            max_water_temp = 0.0
+            radii = []
+            circle = CircleFitter()
+            radius_drifts = []
+            time_to_drift = time_to_overheat = None
+            tick_times = []
+            for _ in range(ticks):
+                sim.advance()
+                tick_start = time.perf_counter()
+                previous_time = data_dict.get("time", start_time)
+                fifth_test.get_data(sim.vehicle, imu, data_dict, yaw_rates, velocities, circle=circle)
+                if job.get("controller") == "pid":
+                    fifth_test.pid_control_loop(sim.vehicle, data_dict, pid_state, cooling_state, **control_gains)
+                else:
+                    fifth_test.control_loop(sim.vehicle, data_dict, yaw_rates, velocities, cooling_state,
+                                            **control_gains)
+                tick_times.append(time.perf_counter() - tick_start)
+                yaw_rate = abs(data_dict["yaw_rate"])
+                now = data_dict["time"]
+                if time_to_drift is None:
+                    batch = ImuBatch(imu.readings, since=previous_time)
+                    drifting = np.flatnonzero(np.abs(batch.angVel[:, 2]) >= drift_yaw_rate)
+                    if len(drifting):
+                        time_to_drift = float(batch.time[drifting[0]]) - start_time
+                if time_to_overheat is None and data_dict["water_temp"] >= cooling_state.start_temperature:
+                    time_to_overheat = now - start_time
+                squared_error += (target_yaw_rate - yaw_rate) ** 2
+                if yaw_rate > 0.2 and not cooling_state.active:
+                    radii.append(data_dict["speed"] / yaw_rate)
+                    if circle.valid:
+                        radius_drifts.append(abs(circle.radius_drift))
+                throttle += data_dict["throttle"]
+                max_water_temp = max(max_water_temp, data_dict["water_temp"])
+        finally:
+            sim.close()
+            fifth_test.log.flush()
+    tick_times.sort()
+    return {
+        "level": job["level"],
+        "part_config": job["part_config"],
+        **({"controller": job["controller"]} if "controller" in job else {}),
+        **({"seed": job["seed"]} if "seed" in job else {}),
+        **gains,
+        "rmse": math.sqrt(squared_error / ticks),
+        "radius_cv": radius_variation(radii),
+        "radius_drift": sum(radius_drifts) / len(radius_drifts) if radius_drifts else 0.0,
+        "mean_throttle": throttle / ticks,
+        "max_water_temp": max_water_temp,
+        "time_to_drift": time_to_drift,
+        "time_to_overheat": time_to_overheat,
+        "control_p50_ms": quantile(tick_times, 0.5) * 1000,
+        "control_p95_ms": quantile(tick_times, 0.95) * 1000,
+        "control_max_ms": tick_times[-1] * 1000 if tick_times else 0.0,
+        "seconds": time.perf_counter() - start,
+        "worker": worker_port if backend == "beamng" else os.getpid(),
+    }
+
+
+# A worker processzek (és BeamNG esetén a példányaik) több run_jobs híváson át is élnek
+@contextlib.contextmanager
+def worker_pool(workers=None, base_port=25252):
+    workers = workers or os.cpu_count()
+    with multiprocessing.Manager() as manager:
+        ports = manager.Queue()
+        for i in range(workers):
+            ports.put(base_port + i)
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(ports,)) as pool:
+            yield pool
+
+
+def run_jobs(pool, jobs, backend="local", ticks=300, home=fifth_test.BEAMNG_HOME):
+    futures = [pool.submit(run_job, job, backend, ticks, home) for job in jobs]
+    return [future.result() for future in futures]
+
+
+def run_sweep(jobs, backend="local", ticks=300, workers=None, base_port=25252, home=fifth_test.BEAMNG_HOME):
+    with worker_pool(workers, base_port) as pool:
+        return run_jobs(pool, jobs, backend, ticks, home)
+
+
+def print_table(rows):
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel scenario / part config / gain sweep")
+    parser.add_argument("--backend", choices=["local", "beamng"], default="local")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--base-port", type=int, default=25252)
+    parser.add_argument("--home", default=fifth_test.BEAMNG_HOME)
+    parser.add_argument("--levels", nargs="+", default=["smallgrid"])
+    parser.add_argument("--part-configs", nargs="+", default=["rwd_active_lsd"], choices=list(PART_CONFIGS))
+    parser.add_argument("--desired-yaw-rate", nargs="+", type=float, default=[1.5, 2.0, 2.5])
+    parser.add_argument("--aggression", nargs="+", type=float, default=[1.0, 2.0, 3.0])
+    parser.add_argument("--throttle-floor", nargs="+", type=float, default=[0.3])
+    parser.add_argument("--csv", help="write the summary table to this file")
+    args = parser.parse_args()
+
+    jobs = make_grid(args.levels, args.part_configs, desired_yaw_rate=args.desired_yaw_rate,
+                     aggression=args.aggression, throttle_floor=args.throttle_floor)
+    start = time.perf_counter()
+    rows = run_sweep(jobs, args.backend, args.ticks, args.workers, args.base_port, args.home)
+    print_table(rows)
+    print(f"{len(rows)} runs in {time.perf_counter() - start:.1f} s")
+    if args.csv:
+        write_csv(rows, args.csv)
+
+if __name__ == "__main__":
+    main()
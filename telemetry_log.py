@@ -0,0 +1,82 @@
+import json
+import queue
+import sys
+import threading
+import time
+
+
+# Strukturált telemetria-napló a tickenkénti print() helyett. A rekordokat egy korlátos
+# sorba tesszük, a formázás és a kiírás egy háttérszálon történik, így a lassú terminál
+# vagy pipe nem fogja meg a vezérlést. Ha a sor tele van, a rekord eldobódik és számoljuk.
+# Csatornánként megadható a maximális naplózási frekvencia (rates={"control": 10}):
+# a gyakoribb rekordokat már a hívó szálon eldobjuk (decimálás). Amelyik csatornának
+# nincs frekvenciája, az mindig megy (pl. események).
+class TelemetryLogger:
+    def __init__(self, rates=None, maxsize=1024, stream=None, fmt="text"):
+        self.rates = dict(rates or {})
+        self.intervals = {channel: 1.0 / rate for channel, rate in self.rates.items()}
+        self.last = {}
+        self.queue = queue.Queue(maxsize)
+        self.stream = stream  # None: mindig az aktuális sys.stdout
+        self.fmt = fmt
+        self.dropped = 0
+        self.decimated = 0
+        self.written = 0
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def log(self, channel, **fields):
+        now = time.perf_counter()
+        interval = self.intervals.get(channel)
+        if interval is not None:
+            if now - self.last.get(channel, -interval) < interval:
+                self.decimated += 1
+                return
+            self.last[channel] = now
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait((now, channel, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                self.write(*record)
+            finally:
+                self.queue.task_done()
+
+    def format(self, now, channel, fields):
+        if self.fmt == "json":
+            return json.dumps({"t": now, "channel": channel, **fields})
+        values = " ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in fields.items())
+        return f"[{channel}] {values}"
+
+    def write(self, now, channel, fields):
+        stream = self.stream or sys.stdout
+        stream.write(self.format(now, channel, fields) + "\n")
+        self.written += 1
+        if self.queue.empty():
+            stream.flush()
+
+    # megvárja, amíg minden sorban álló rekord kiíródik
+    def flush(self):
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def report(self):
+        print(f"Log: {self.written} written, {self.decimated} decimated, {self.dropped} dropped")
@@ -0,0 +1,99 @@
+import json
+import os
+from array import array
+
+
+# Oszlopok: név és típus (array típuskód, ugyanaz a numpy-nak is: 'd' = float64, 'f' = float32)
+COLUMNS = [
+    ("time", "d"),
+    ("speed", "f"),
+    ("yaw_rate", "f"),
+    ("velocity", "f"),  # angAccel[2]
+    ("water_temp", "f"),
+    ("wheelspeed", "f"),
+    ("steering", "f"),
+    ("throttle", "f"),
+    ("brake", "f"),
+    ("sideslip", "f"),  # state_estimator
+    ("v_long", "f"),
+    ("v_lat", "f"),
+    ("pos_x", "d"),
+    ("pos_y", "d"),
+    ("circle_radius", "f"),  # circle_fit
+    ("circle_center_x", "d"),
+    ("circle_center_y", "d"),
+    ("radius_drift", "f"),
+    ("center_drift", "f"),
+    ("traction_confidence", "f"),  # traction_monitor
+]
+
+NUMPY_TYPES = {"d": "<f8", "f": "<f4"}
+
+
+# Oszlopos telemetria-rögzítő: minden tickben a data_dict mezőit előre lefoglalt,
+# típusos array oszlopokba írja. Ha egy chunk megtelik, oszloponként egy-egy bináris
+# fájl végére írjuk ki, így a memóriahasználat állandó és egy tick költsége is az.
+# A fájlok numpy.memmap-pel másolás nélkül visszatölthetők (load_telemetry).
+class TelemetryRecorder:
+    def __init__(self, path, chunk_size=4096, columns=COLUMNS):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.columns = columns
+        self.count = 0
+        self.filled = 0
+        os.makedirs(path, exist_ok=True)
+        self.buffers = [array(code, bytes(array(code).itemsize * chunk_size)) for _, code in columns]
+        self.files = [open(os.path.join(path, f"{name}.bin"), "wb") for name, _ in columns]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, data_dict):
+        i = self.filled
+        for (name, _), buffer in zip(self.columns, self.buffers):
+            buffer[i] = data_dict.get(name, 0.0)
+        self.filled += 1
+        self.count += 1
+        if self.filled == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        for buffer, f in zip(self.buffers, self.files):
+            f.write(memoryview(buffer)[:self.filled])
+            f.flush()
+        self.filled = 0
+        self.write_meta()
+
+    def write_meta(self):
+        meta = {
+            "count": self.count,
+            "columns": [[name, NUMPY_TYPES[code]] for name, code in self.columns],
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def close(self):
+        if self.files[0].closed:
+            return
+        self.flush()
+        for f in self.files:
+            f.close()
+
+
+# Egy felvétel visszatöltése: oszlopnév -> numpy.memmap (csak olvasható, nincs másolás)
+def load_telemetry(path):
+    import numpy as np
+
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    count = meta["count"]
+    columns = {}
+    for name, dtype in meta["columns"]:
+        if count == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+            continue
+        columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(count,))
+    return columns
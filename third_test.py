@@ -1,52 +1,30 @@
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy.stats import linregress
 import time
 import random
 import math
 import logging
 
-from beamngpy import BeamNGpy, Scenario, Vehicle, set_up_simple_logging
+from beamngpy import set_up_simple_logging
 from beamngpy.sensors import AdvancedIMU, Electrics, Sensor, PowertrainSensor
 
-def cooling(vehicle):
-    vehicle.control(steering=0, throttle=0.2, brake=0, parkingbrake=0,clutch=0, gear=3)
-    time.sleep(10)
-    electrics_data = vehicle.sensors["electrics"]
-    while round(electrics_data["wheelspeed"],1) != 0:
-        vehicle.sensors.poll()
-        electrics_data = vehicle.sensors["electrics"]
-        vehicle.control(steering=0, throttle=0, brake=1)
-    vehicle.control(steering=0, throttle=1, brake=0)
+from cooling_state import CoolingStateMachine
+from session_manager import DriftSession
+from imu_batch import ImuBatch
 
 def main():
     random.seed(1703)
     set_up_simple_logging()
     logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-    beamng = BeamNGpy("localhost", 25252, home="F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0")
-    bng = beamng.open(launch=True)
-
-    scenario = Scenario("smallgrid","autonomous_drifting_demo",)
-    vehicle = Vehicle("ego_vehicle", model="etk800", license="SPEED-007", color="Blue")
-
-    scenario.add_vehicle(vehicle, pos=(0,0,0))
-    scenario.make(bng)
-
-    bng.settings.set_deterministic(60)  # Set simulator to 60hz temporal resolution
-
-    bng.scenario.load(scenario)
-    bng.scenario.start()
-    
-    options = vehicle.get_part_options()
-
     config = {
         "etk800_differential_R": "etk800_differential_R_active_LSD",
         "etk800_radiator": "etk800_radiator_high_performance",
         "etk800_steering_wide":"etk800_steering_wide_drift",
         "etk_engine":"etk_engine_v8_4.4_petrol",
         "etk_intake_v8_4.4_petrol":"etk_intake_v8_4.4_petrol_rennspecht"}
-    vehicle.set_part_config({"parts":config})
+
+    # ha már fut a BeamNG, csatlakozunk hozzá, és a scenariót / alkatrészeket csak szükség esetén töltjük újra
+    session = DriftSession("F:/BeamNG.tech.v0.31.3.0/BeamNG.tech.v0.31.3.0", parts=config).open()
+    bng, vehicle = session.bng, session.vehicle
 
     imu = AdvancedIMU("accel1", bng, vehicle, gfx_update_time=0.01)
     electrics = Electrics()
@@ -69,7 +47,10 @@ def main():
 
     error_integral = 0.0
     prev_error = 0.0
-    prev_time = time.time()  # vagy az első adatból származó idő
+    prev_time = None  # az utolsó feldolgozott IMU minta ideje (szimulátor idő)
+    # 10 másodpercig gurul lassan, megáll, majd egyenesen teljes gázzal indul
+    cooling_state = CoolingStateMachine(cool_temperature=None, cool_seconds=10, stop_wait=0,
+                                        relaunch_steering=0, relaunch_seconds=0)
 
     def control_loop():
         nonlocal error_integral, prev_error, prev_time
@@ -79,11 +60,16 @@ def main():
         electrics_data = vehicle.sensors["electrics"]
         speed = electrics_data["virtualAirspeed"]
 
-        data = imu.poll()[0.0]
+        # a poll óta gyűlt összes (100 Hz-es) minta, időrendben; a tick értékei a legfrissebből
+        batch = ImuBatch(imu.poll(), since=prev_time)
+        data = batch.latest()
+        batch_start = prev_time
+        if len(batch):
+            prev_time = batch.time[-1]
 
         # Hőmérséklet figyelése
-        if electrics_data["water_temperature"] > 115:
-            cooling(vehicle)
+        if cooling_state.update(vehicle, electrics_data["water_temperature"], electrics_data["wheelspeed"], data["time"]):
+            return
 
         # Szenzoradatok: az angVel[2] a yaw_rate
         yaw_rate = data["angVel"][2]
@@ -92,22 +78,17 @@ def main():
         yaw_accel = data["angAccel"][2]
         print("yaw_accel:", yaw_accel)
 
-        # Számoljuk ki a vezérlési ciklus idejét (dt)
-        current_time = time.time()
-        dt = current_time - prev_time if current_time - prev_time > 0 else 0.01
-        prev_time = current_time
-        # print("dt:", dt)
-
         # Hiba kiszámítása: kívánt yaw_rate - mért yaw_rate
         error = desired_yaw_rate - yaw_rate
         # print("error:",error)
-        
-
-        # Integráljuk a hibát
-        error_integral += error * dt
 
-        # Derivált számítása
-        error_derivative = (error - prev_error) / dt
+        # Integráljuk a hibát mintánként, a minták saját idejével (dt a szimulátor órájából)
+        # Derivált: az előző tick utolsó mintájától a mostani legfrissebbig
+        error_derivative = 0.0
+        if len(batch) and batch_start is not None:
+            errors = desired_yaw_rate - batch.angVel[:, 2]
+            error_integral += float(errors @ batch.dts(batch_start))
+            error_derivative = (error - prev_error) / (prev_time - batch_start)
         prev_error = error
 
         # PID kimenet a kormányzásra
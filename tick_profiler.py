@@ -0,0 +1,108 @@
+import math
+import signal
+import time
+
+# Hisztogram vödrök: oktávonként 4, 1 µs-tól kb. 16 s-ig (a vödör felső határa ~19%-kal nagyobb)
+BUCKETS_PER_OCTAVE = 4
+MIN_SECONDS = 1e-6
+BUCKET_COUNT = 24 * BUCKETS_PER_OCTAVE
+
+
+# Fix memóriájú késleltetés-hisztogram: logaritmikus vödrök darabszámmal, a pontos maximummal
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds > MIN_SECONDS:
+            bucket = min(int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_OCTAVE), BUCKET_COUNT - 1)
+        else:
+            bucket = 0
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    # a percentilist tartalmazó vödör felső határa (de legfeljebb a mért maximum)
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(MIN_SECONDS * 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE), self.max)
+        return self.max
+
+
+class Span:
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.add(time.perf_counter() - self.start)
+
+
+class NullSpan:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+# Tick profiler: nevesített szakaszok (with profiler.span("get_data"): ...) késleltetését
+# gyűjti hisztogramokba. Kikapcsolva a span() mindig ugyanazt az üres objektumot adja
+# vissza, így a mérés gyakorlatilag semmibe sem kerül.
+class TickProfiler:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = {}
+        self.histograms = {}
+        self.ticks = 0
+        self.started = time.perf_counter()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        span = self.spans.get(name)
+        if span is None:
+            self.histograms[name] = LatencyHistogram()
+            span = self.spans[name] = Span(self.histograms[name])
+        return span
+
+    def add(self, name, seconds):
+        if self.enabled:
+            self.span(name).histogram.add(seconds)
+
+    def tick(self):
+        self.ticks += 1
+
+    def frequency(self):
+        elapsed = time.perf_counter() - self.started
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        print(f"Control frequency: {self.frequency():.1f} Hz ({self.ticks} ticks)")
+        for name, h in self.histograms.items():
+            print(f"  {name}: n={h.count} mean {h.total / h.count * 1000:.3f} ms, "
+                  f"p50 {h.percentile(50) * 1000:.3f} ms, p95 {h.percentile(95) * 1000:.3f} ms, "
+                  f"p99 {h.percentile(99) * 1000:.3f} ms, max {h.max * 1000:.3f} ms")
+
+    # Jelzésre (Linuxon SIGUSR1, Windowson Ctrl+Break) futás közben is kiírja az összesítőt
+    def install_signal_handler(self):
+        sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if sig is not None:
+            signal.signal(sig, lambda signum, frame: self.report())
@@ -0,0 +1,246 @@
+import math
+import time
+
+# a residuumok nevei, ebben a sorrendben (a cause mező ezek egyike)
+SIGNALS = ("yaw", "lateral", "slip")
+
+
+# Tapadásvesztés-érzékelő a stabilitásszabályozáshoz (README 4. pont), IMU mintánként futva:
+# - yaw: a mért yaw_rate eltérése attól, amit a kormányállásból egy tapadó autó adna
+#   (egynyomú modell: v * delta / (L * (1 + v² / v_ch²)), steering = -1 -> pozitív yaw_rate;
+#   a kormányváltozást az autó yaw_lag időállandóval követi, a referencia is így késik),
+# - lateral: az accSmooth oldalgyorsulása és a v * yaw_rate eltérése (tapadásnál a kettő egyezik,
+#   a különbség a sideslip változása),
+# - slip: a wheelspeed és a virtualAirspeed relatív eltérése (kipörgés / blokkolás).
+# Mindhárom residuumot tau időállandójú exponenciális szűrő simítja, és a küszöbéhez mérjük:
+# a küszöb felénél 0, másfélszeresénél 1 a valószínűsége; a confidence 1 - Π(1 - p).
+# Esemény (lost = True), ha a confidence legalább hold ideig trigger fölött van, és akkor ér
+# véget, ha release alá esik. A latency_ms a riasztás ideje a kitérés kezdetéhez képest (amikor
+# a confidence először onset fölé ment), mindkettő az IMU idejében.
+# A kormány, a sebesség és a wheelspeed tickenként frissül (electrics), az IMU mintánként.
+class TractionMonitor:
+    def __init__(self, max_steering_angle=0.6, wheelbase=2.8, characteristic_speed=25.0, yaw_lag=0.15,
+                 min_speed=3.0, yaw_threshold=0.25, yaw_relative=0.1, lateral_threshold=3.0, slip_threshold=0.2,
+                 tau=0.04, trigger=0.6, release=0.3, onset=0.1, hold=0.03):
+        self.max_steering_angle = max_steering_angle
+        self.wheelbase = wheelbase
+        self.characteristic_speed = characteristic_speed  # az alulkormányzottság: e fölött csökken a yaw
+        self.yaw_lag = yaw_lag
+        self.min_speed = min_speed  # ez alatt (parkolás, indulás) nem riasztunk
+        self.yaw_threshold = yaw_threshold  # rad/s
+        self.yaw_relative = yaw_relative  # a várt yaw_rate ennyiszeresével nő a küszöb
+        self.lateral_threshold = lateral_threshold  # m/s²
+        self.slip_threshold = slip_threshold
+        self.tau = tau
+        self.trigger = trigger
+        self.release = release
+        self.onset = onset
+        self.hold = hold
+        self.reset()
+
+    def reset(self):
+        self.time = None
+        self.reference = 0.0  # a késleltetett várt yaw_rate
+        self.residuals = [0.0, 0.0, 0.0]
+        self.probabilities = [0.0, 0.0, 0.0]
+        self.confidence = 0.0
+        self.lost = False
+        self.rise_time = None  # a mostani kitérés kezdete
+        self.above_since = None  # mióta van trigger fölött
+        self.events = []
+        self.samples = 0
+        self.processing_ms = 0.0
+
+    def expected_yaw_rate(self, steering, speed):
+        delta = -min(1.0, max(-1.0, steering)) * self.max_steering_angle
+        return speed * delta / (self.wheelbase * (1 + (speed / self.characteristic_speed) ** 2))
+
+    # egy IMU minta; wheelspeed None, ha nincs (pl. IMU felvétel visszajátszásánál)
+    def step(self, now, yaw_rate, lateral_accel, steering, speed, wheelspeed=None):
+        self.samples += 1
+        if self.time is None:
+            self.time = now
+            self.reference = self.expected_yaw_rate(steering, speed)
+            return
+        dt = now - self.time
+        if dt <= 0:
+            return
+        self.time = now
+
+        expected = self.expected_yaw_rate(steering, speed)
+        self.reference += (1 - math.exp(-dt / self.yaw_lag)) * (expected - self.reference)
+        expected = self.reference
+        if speed < self.min_speed:
+            raw = (0.0, 0.0, 0.0)
+        else:
+            raw = (
+                abs(yaw_rate - expected) / (self.yaw_threshold + self.yaw_relative * abs(expected)),
+                abs(lateral_accel - speed * yaw_rate) / self.lateral_threshold,
+                abs(wheelspeed - speed) / max(speed, self.min_speed) / self.slip_threshold
+                if wheelspeed is not None else 0.0,
+            )
+        alpha = 1 - math.exp(-dt / self.tau)
+        keep = 1.0
+        for i, value in enumerate(raw):
+            residual = self.residuals[i] + alpha * (value - self.residuals[i])
+            self.residuals[i] = residual
+            probability = min(1.0, max(0.0, residual - 0.5))
+            self.probabilities[i] = probability
+            keep *= 1 - probability
+        confidence = self.confidence = 1 - keep
+
+        if confidence >= self.onset:
+            if self.rise_time is None:
+                self.rise_time = now
+        elif not self.lost:
+            self.rise_time = None
+
+        if self.lost:
+            if confidence < self.release:
+                self.lost = False
+                self.above_since = None
+                self.events[-1]["end"] = now
+            return
+        if confidence < self.trigger:
+            self.above_since = None
+            return
+        if self.above_since is None:
+            self.above_since = now
+        if now - self.above_since >= self.hold:
+            self.lost = True
+            self.events.append({
+                "time": now,
+                "onset": self.rise_time,
+                "latency_ms": (now - self.rise_time) * 1000,
+                "confidence": confidence,
+                "cause": SIGNALS[max(range(len(SIGNALS)), key=self.probabilities.__getitem__)],
+                "end": None,
+            })
+
+    # egy poll összes mintája (imu_batch.ImuBatch) a tick electrics értékeivel; True, ha ebben a
+    # batch-ben kezdődött új esemény. Az oldalgyorsulás balra pozitív (dirZ jobbra mutat).
+    def update_batch(self, batch, steering, speed, wheelspeed=None):
+        start = time.perf_counter()
+        events = len(self.events)
+        for now, ang_vel, acc in zip(batch.time.tolist(), batch.angVel.tolist(), batch.accSmooth.tolist()):
+            self.step(now, ang_vel[2], -acc[2], steering, speed, wheelspeed)
+        self.processing_ms = (time.perf_counter() - start) * 1000
+        return len(self.events) > events
+
+    def state(self):
+        event = self.events[-1] if self.events else None
+        return {
+            "traction_lost": self.lost,
+            "traction_confidence": self.confidence,
+            "traction_latency_ms": event["latency_ms"] if event else None,
+            "traction_cause": event["cause"] if event else None,
+        }
+
+
+# Benchmark 1: IMU felvételek (tmp_*.json). Electrics nincs bennük, a sebességet a pozícióból
+# becsüljük, a kormányt a felvétel neve adja (left_circle: -1, right_circle: 1, forward: 0).
+# A körök drift közben készültek, ott riasztás kell, egyenesen nem.
+def replay_dump(path, steering, monitor=None):
+    from imu_replay import load_imu_dump
+
+    monitor = monitor or TractionMonitor()
+    previous = None
+    for sample in load_imu_dump(path):
+        speed = 0.0
+        if previous is not None and sample["time"] > previous["time"]:
+            speed = math.dist(sample["pos"][:2], previous["pos"][:2]) / (sample["time"] - previous["time"])
+        monitor.step(sample["time"], sample["angVel"][2], -sample["accSmooth"][2], steering, speed)
+        previous = sample
+    return monitor
+
+
+# Benchmark 2: n autó a LocalSim-ben ismert pillanatban kiváltott megcsúszással. Mindegyik
+# egyenesen gyorsít, a kick időpontban kormányt és gázt kap (kick_steering, kick_throttle autónként);
+# a valódi kezdet az első minta, ahol a |sideslip| eléri a slip_degrees-t (a hátsó tengely csúszik),
+# vagy az első kerék csúszási szöge túllépi a gumimodell csúcsát (az eleje tolni kezd), és ez legalább
+# persist ideig tart (a kormány ugrásakor a csúszási szög egy pillanatra mindig nagy). Amelyik autó
+# végig tapad (kis kormány, kevés gáz), annál a riasztás téves. A detektor tickenként (tick_steps fizikai lépés)
+# kapja a batch-et, mint a fifth_test-ben.
+def simulate_onsets(kick_steering, kick_throttle, kick=3.0, duration=6.0, slip_degrees=5.0, persist=0.1,
+                    tick_steps=6, **kwargs):
+    import numpy as np
+
+    from imu_batch import ImuBatch
+    from local_sim import FRONT_AXLE, KINEMATIC_SPEED, MAX_STEERING_ANGLE, TIRE_B, TIRE_C, LocalSim
+
+    n = len(kick_steering)
+    sim = LocalSim(n)
+    for i in range(n):
+        sim.buffer_imu(i)
+    monitors = [TractionMonitor(**kwargs) for _ in range(n)]
+    truth = [None] * n
+    since = np.full(n, np.nan)  # mióta áll fenn a csúszás
+    # C * atan(B * alpha) = pi / 2: itt a legnagyobb az első gumi oldalereje
+    peak_slip_angle = math.tan(math.pi / 2 / TIRE_C) / TIRE_B
+    steering = np.zeros(n)
+    sim.control(steering=steering, throttle=0.6)
+    processing = []
+    while sim.time < duration:
+        if sim.time >= kick and not steering.any():
+            steering = np.asarray(kick_steering, dtype=float)
+            sim.control(steering=steering, throttle=np.asarray(kick_throttle, dtype=float))
+        for _ in range(tick_steps):
+            sim.step()
+            sideslip = np.degrees(np.abs(sim.sideslip))
+            front_slip = np.abs(-sim.steering * MAX_STEERING_ANGLE - np.arctan2(
+                sim.vy + FRONT_AXLE * sim.yaw_rate, np.maximum(np.abs(sim.vx), KINEMATIC_SPEED[0])))
+            lost = (sideslip >= slip_degrees) | (front_slip >= peak_slip_angle)
+            lost &= sim.speed > 3.0
+            since = np.where(lost, np.where(np.isnan(since), sim.time, since), np.nan)
+            for i in np.flatnonzero(sim.time - since >= persist):
+                if truth[i] is None:
+                    truth[i] = float(since[i])
+        for i, monitor in enumerate(monitors):
+            batch = ImuBatch(sim.imus[i].poll())
+            # az electrics ugyanúgy tickenként frissül, mint a BeamNG-ben
+            monitor.update_batch(batch, float(sim.steering[i]), float(sim.speed[i]), float(sim.wheelspeed[i]))
+            processing.append(monitor.processing_ms / max(len(batch), 1))
+    return monitors, truth, processing
+
+
+def main():
+    import sys
+
+    for path, steering in (("tmp_left_circle.json", -1.0), ("tmp_right_circle.json", 1.0),
+                           ("tmp_forward_only.json", 0.0)):
+        monitor = replay_dump(path, steering)
+        event = monitor.events[0] if monitor.events else None
+        detail = f'{event["cause"]} after {event["latency_ms"]:.0f} ms' if event else "no event"
+        print(f"{path}: {monitor.samples} samples, confidence {monitor.confidence:.2f}, {detail}")
+
+    # kormány x gáz rács, felváltva balra és jobbra
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    kick_steering, kick_throttle = [], []
+    for steering in [0.05 + 0.95 * i / (steps - 1) for i in range(steps)]:
+        for throttle in (0.0, 0.3, 0.6, 1.0):
+            kick_steering.append((-1) ** len(kick_steering) * steering)
+            kick_throttle.append(throttle)
+    cars = len(kick_steering)
+    monitors, truth, processing = simulate_onsets(kick_steering, kick_throttle)
+    latencies = []
+    missed = false_alarms = 0
+    for monitor, onset in zip(monitors, truth):
+        event = monitor.events[0] if monitor.events else None
+        if onset is None:
+            false_alarms += event is not None
+        elif event is None:
+            missed += 1
+        else:
+            latencies.append((event["time"] - onset) * 1000)
+    latencies.sort()
+    slipped = sum(onset is not None for onset in truth)
+    print(f"local sim: {slipped} of {cars} cars lost traction, {missed} missed, {false_alarms} false alarms "
+          f"among the {cars - slipped} that kept grip")
+    if latencies:
+        print(f"detection vs true onset: p50 {latencies[len(latencies) // 2]:.0f} ms, "
+              f"min {latencies[0]:.0f} ms, max {latencies[-1]:.0f} ms (negative: before the true onset)")
+    processing.sort()
+    print(f"processing: p50 {processing[len(processing) // 2] * 1000:.1f} us per IMU sample")
+
+if __name__ == "__main__":
+    main()